@@ -1,59 +1,274 @@
-from flask import Flask, request, jsonify
+import hashlib
+import json
+import threading
+from datetime import datetime
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
-from services.ml_service import MLService
+from services.ml_service import MLService, ModelNotReadyError
 from services.graph_service import GraphService
-from models.prediction_log import PredictionLogger
+from services.snapshot_engine import SnapshotEngine
+from services.api_service import APIService
+from services.http_client import HTTPClient
+from services.log_export import FORMATS, ndjson_chunks, csv_chunks, gzip_chunks
+from utils.constants import REGION_MAP
+from config import Config
 
 app = Flask(__name__)
 CORS(app)  
 
-ml_service = MLService()
-graph_service = GraphService(ml_service)
-logger = PredictionLogger()
+ml_service = MLService(load=False)
+snapshot_engine = SnapshotEngine(ml_service) if Config.SNAPSHOT_ENABLED else None
+graph_service = GraphService(ml_service, snapshot_engine)
+logger = ml_service.logger  # Share the writer so reads and clears can flush pending rows
 
-@app.route('/api/predict', methods=['POST'])
+def start_model():
+    """Load and warm the model, then start the snapshot scheduler"""
+    if ml_service.load_artifacts() and ml_service.warm_up() and snapshot_engine is not None:
+        snapshot_engine.start()
+
+if Config.MODEL_BACKGROUND_LOAD:
+    threading.Thread(target=start_model, name='model-startup', daemon=True).start()
+else:
+    start_model()
+
+# Endpoints that need the model; they answer 503 until it is loaded and warmed
+MODEL_ENDPOINTS = {'predict_endpoint', 'predict_batch_endpoint', 'spread_simulation_endpoint', 'path_analysis_endpoint',
+                   'prediction_changes_endpoint'}
+
+def not_ready_response():
+    response = jsonify({'error': 'Model is not ready', 'status': ml_service.status()})
+    response.headers['Retry-After'] = '5'
+    return response, 503
+
+@app.before_request
+def require_ready_model():
+    if request.endpoint in MODEL_ENDPOINTS and not ml_service.ready:
+        return not_ready_response()
+
+@app.errorhandler(ModelNotReadyError)
+def model_not_ready_handler(e):
+    return not_ready_response()
+
+def request_data():
+    """JSON body of a POST, or the query string of a GET (plain conditional GETs for pollers)"""
+    return request.get_json(silent=True) or request.args.to_dict()
+
+def digest(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+def conditional_json(tag, build):
+    """
+    JSON response with a weak ETag. When If-None-Match already holds the tag the answer
+    is 304 and build() is never called, so unchanged polls cost no computation.
+    """
+    if request.if_none_match.contains_weak(tag):
+        response = Response(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(tag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'  # Always revalidate
+    return response
+
+@app.route('/healthz', methods=['GET'])
+def healthz_endpoint():
+    """Liveness: the process is up and serving requests"""
+    return jsonify({'status': 'ok'})
+
+@app.route('/readyz', methods=['GET'])
+def readyz_endpoint():
+    """Readiness: artifacts loaded and the model warmed up"""
+    status = ml_service.status()
+    return jsonify(status), (200 if status['ready'] else 503)
+
+@app.route('/api/predict', methods=['GET', 'POST'])
 def predict_endpoint():
-    data = request.get_json()
+    data = request_data()
     country = data.get('country')
     if not country: return jsonify({'error': 'No country'}), 400
     
-    result = ml_service.predict_country(country)
-    return jsonify({'country': country, 'prediction': result})
+    # Serve from the global snapshot when it covers the country, else predict live
+    snapshot = snapshot_engine.get() if snapshot_engine is not None else None
+    result = snapshot.get(country) if snapshot is not None else None
+    if result is None:
+        prediction = ml_service.predict_country(country)
+        return conditional_json(f'predict-{digest([country, prediction])}', lambda: {
+            'country': country, 'prediction': prediction, 'snapshot_age_seconds': None
+        })
+    
+    snapshot_engine.log_served(snapshot, country)
+    # Tagged by the whole prediction (features and explanation included), not by the refresh
+    return conditional_json(f'predict-{digest([country, result])}', lambda: {
+        'country': country,
+        'prediction': result,
+        'snapshot_version': snapshot.token(snapshot.version),
+        'snapshot_age_seconds': round(snapshot.age(), 1)
+    })
+
+@app.route('/api/predict/batch', methods=['POST'])
+def predict_batch_endpoint():
+    """Predict for a list of countries (or "all") in one batched model call"""
+    data = request.get_json() or {}
+    countries = data.get('countries')
+    if countries == 'all': countries = list(REGION_MAP.keys())
+    if not countries or not isinstance(countries, list):
+        return jsonify({'error': 'No countries'}), 400
+    if not all(isinstance(c, str) for c in countries):
+        return jsonify({'error': 'countries must be "all" or a list of country names'}), 400
+    
+    # Bulk work: fetched on the bulk pool so it can't starve single predictions
+    results = ml_service.predict_countries(countries, background=True)
+    return jsonify({
+        'total': len(results),
+        'predictions': [{'country': c, 'prediction': p} for c, p in results.items()]
+    })
 
-@app.route('/api/simulation/spread', methods=['POST'])
+@app.route('/api/simulation/spread', methods=['GET', 'POST'])
 def spread_simulation_endpoint():
-    data = request.get_json()
+    data = request_data()
     country = data.get('country')
     if not country: return jsonify({'error': 'No country'}), 400
     
-    graph_data = graph_service.build_simulation_bfs(country)
-    return jsonify(graph_data)
+    snapshot = graph_service.current_snapshot()
+    if snapshot is None:
+        graph_data = graph_service.build_simulation_bfs(country)
+        return conditional_json(f'spread-{digest(graph_data)}', lambda: graph_data)
+    snapshot_engine.log_served(snapshot, country)  # One row per request, for the start country
+    # Same flight graph and predictions -> same layers; checked before running the BFS
+    tag = f'spread-{graph_service.flight_graph.version}-{snapshot.token(snapshot.data_version)}-{digest(country)}'
+    return conditional_json(tag, lambda: graph_service.build_simulation_bfs(country))
 
-@app.route('/api/simulation/path', methods=['POST'])
+@app.route('/api/simulation/path', methods=['GET', 'POST'])
 def path_analysis_endpoint():
-    data = request.get_json()
+    data = request_data()
     start = data.get('start_country')
     end = data.get('end_country')
+    if not start or not end: return jsonify({'error': 'No start_country or end_country'}), 400
+    
+    snapshot = graph_service.current_snapshot()
+    if snapshot is not None:
+        snapshot_engine.log_served(snapshot, start)  # One row per request, for the start country
     
-    result = graph_service.find_safest_path_a_star(start, end)
-    return jsonify(result)
+    # Only valid, distinct countries need the path index (building it may predict every country)
+    index = None
+    if Config.PATH_INDEX_ENABLED and start in REGION_MAP and end in REGION_MAP and start != end:
+        index = graph_service.get_path_index()
+    if index is not None:
+        tag = f'path-{index.version}-{digest([start, end])}'
+        return conditional_json(tag, lambda: graph_service.find_safest_path(start, end))
+    result = graph_service.find_safest_path(start, end)
+    return conditional_json(f'path-{digest(result)}', lambda: result)
+
+@app.route('/api/predictions/changes', methods=['GET'])
+def prediction_changes_endpoint():
+    """
+    Change feed over the global snapshot: countries whose prediction or risk level changed
+    after version `since` (the `version` of the previous response). Without since, or with
+    one this server can't answer, every country is returned with reset=true.
+    """
+    if snapshot_engine is None:
+        return jsonify({'error': 'The change feed needs the snapshot engine (SNAPSHOT_ENABLED)'}), 404
+    feed = snapshot_engine.changes(request.args.get('since', default=None))
+    if feed is None:
+        return not_ready_response()
+    return jsonify(feed)
 
 @app.route('/api/logs', methods=['GET'])
 def get_logs_endpoint():
-    """Get recent prediction logs"""
+    """
+    Get prediction logs, newest first.
+    Query: limit, country, before_id / after_id (page cursors from the previous response),
+    fields (comma-separated columns), features=true (decode raw feature vectors)
+    """
     limit = request.args.get('limit', default=50, type=int)
     country = request.args.get('country', default=None, type=str)
+    before_id = request.args.get('before_id', default=None, type=int)
+    after_id = request.args.get('after_id', default=None, type=int)
+    fields = request.args.get('fields', default=None, type=str)
+    # Raw feature vectors are decoded only on request (?features=true)
+    include_features = request.args.get('features', default='false').lower() == 'true'
+    logger.flush(timeout=1.0)  # Include rows still in the write queue
     
-    if country:
-        logs = logger.get_logs_by_country(country, limit)
-    else:
-        logs = logger.get_recent_logs(limit)
+    try:
+        page = logger.query_logs(
+            country, limit, before_id=before_id, after_id=after_id,
+            fields=fields.split(',') if fields else None, include_features=include_features
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify({
-        'total': len(logs),
-        'logs': logs
+        'total': len(page['logs']),
+        'logs': page['logs'],
+        'next_before_id': page['next_before_id'],
+        'prev_after_id': page['prev_after_id']
     })
 
+@app.route('/api/logs/export', methods=['GET'])
+def export_logs_endpoint():
+    """
+    Stream prediction logs in chronological order (constant memory for any size).
+    Query: format=ndjson|csv, country, since / until (ISO timestamps), fields,
+    features=true, gzip=true (also used when the client accepts gzip)
+    """
+    fmt = request.args.get('format', default='ndjson').lower()
+    if fmt not in FORMATS:
+        return jsonify({'error': f"Unsupported format '{fmt}' (use {', '.join(FORMATS)})"}), 400
+    country = request.args.get('country', default=None, type=str)
+    since = request.args.get('since', default=None, type=str)
+    until = request.args.get('until', default=None, type=str)
+    for value in (since, until):
+        if value:
+            try:
+                datetime.fromisoformat(value)
+            except ValueError:
+                return jsonify({'error': f"Invalid timestamp '{value}'"}), 400
+    fields = request.args.get('fields', default=None, type=str)
+    include_features = request.args.get('features', default='false').lower() == 'true'
+    try:
+        columns = logger.select_fields(fields.split(',') if fields else None)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if include_features:
+        columns.append('features')
+    
+    logger.flush(timeout=1.0)
+    rows = logger.iter_logs(country, since, until, columns[:-1] if include_features else columns, include_features)
+    chunks = csv_chunks(rows, columns) if fmt == 'csv' else ndjson_chunks(rows)
+    
+    # The encoding depends on Accept-Encoding, so caches must key on it
+    headers = {'Content-Disposition': f'attachment; filename=prediction_logs.{fmt}', 'Vary': 'Accept-Encoding'}
+    use_gzip = request.args.get('gzip', '').lower() == 'true' or 'gzip' in request.headers.get('Accept-Encoding', '')
+    if use_gzip:
+        chunks = gzip_chunks(chunks)
+        headers['Content-Encoding'] = 'gzip'
+    return Response(stream_with_context(chunks), mimetype=FORMATS[fmt], headers=headers)
+
+@app.route('/api/logs/stats', methods=['GET'])
+def log_stats_endpoint():
+    """
+    Aggregates over prediction logs, read from the daily rollup tables (no row scans).
+    Query: since / until (dates; inclusive / exclusive, timestamps are truncated to the day),
+    country, region, window=day|week|month (buckets for the feature drift series)
+    """
+    bounds = {}
+    for name in ('since', 'until'):
+        value = request.args.get(name, default=None, type=str)
+        if value:
+            try:
+                bounds[name] = datetime.fromisoformat(value).date().isoformat()
+            except ValueError:
+                return jsonify({'error': f"Invalid date '{value}'"}), 400
+    country = request.args.get('country', default=None, type=str)
+    region = request.args.get('region', default=None, type=str)
+    window = request.args.get('window', default='day').lower()
+    logger.flush(timeout=1.0)
+
+    try:
+        stats = logger.get_stats(country=country, region=region, window=window, **bounds)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(dict(stats, since=bounds.get('since'), until=bounds.get('until')))
+
 @app.route('/api/logs/clear', methods=['POST'])
 def clear_logs_endpoint():
     """Clear all prediction logs"""
@@ -63,5 +278,21 @@ def clear_logs_endpoint():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/snapshot', methods=['GET'])
+def snapshot_stats_endpoint():
+    """Version, age and refresh state of the global risk snapshot"""
+    if snapshot_engine is None: return jsonify({'enabled': False})
+    return jsonify(dict(snapshot_engine.stats(), enabled=True))
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats_endpoint():
+    """Hit/miss counters for the upstream data caches"""
+    return jsonify(APIService.cache_stats())
+
+@app.route('/api/upstream/health', methods=['GET'])
+def upstream_health_endpoint():
+    """Circuit breaker state per upstream host"""
+    return jsonify(HTTPClient.breaker_stats())
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
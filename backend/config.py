@@ -10,7 +10,79 @@ class Config:
     MODEL_PATH = os.path.join(DATA_DIR, 'best_ann_model (1).h5')
     SCALER_X_PATH = os.path.join(DATA_DIR, 'scaler_X (1).pkl')
     SCALER_Y_PATH = os.path.join(DATA_DIR, 'scaler_y (1).pkl')
+    WHO_DUMP_PATH = os.path.join(DATA_DIR, 'who_malaria_conf_cases.json')
+    CLIMATE_DATASET_PATH = os.path.join(os.path.dirname(BASE_DIR), 'climate_disease_dataset.csv')
+    FEATURE_STORE_PATH = os.path.join(DATA_DIR, 'lag_features.npy')
     
     WEATHER_API_KEY = os.getenv('WEATHER_API_KEY', '')
     NINJA_API_KEY = os.getenv('NINJA_API_KEY', '')
-    AVIATION_KEY = os.getenv('AVIATION_KEY', '')
\ No newline at end of file
+    AVIATION_KEY = os.getenv('AVIATION_KEY', '')
+    
+    # Upstream data caches (seconds)
+    WEATHER_CACHE_TTL = int(os.getenv('WEATHER_CACHE_TTL', 600))
+    DENSITY_CACHE_TTL = int(os.getenv('DENSITY_CACHE_TTL', 7 * 24 * 3600))
+    WHO_CACHE_TTL = int(os.getenv('WHO_CACHE_TTL', 24 * 3600))
+    FLIGHT_CACHE_TTL = int(os.getenv('FLIGHT_CACHE_TTL', 3600))
+    CACHE_FALLBACK_TTL = int(os.getenv('CACHE_FALLBACK_TTL', 300))
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 512))
+    
+    # Upstream HTTP: pooled sessions, retries and circuit breakers
+    HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 10))
+    HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 2.0))
+    HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', 2))
+    HTTP_BACKOFF = float(os.getenv('HTTP_BACKOFF', 0.2))
+    BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', 3))
+    BREAKER_RESET_TIMEOUT = float(os.getenv('BREAKER_RESET_TIMEOUT', 30.0))
+    
+    # Concurrent upstream fetches per prediction
+    FETCH_WORKERS = int(os.getenv('FETCH_WORKERS', 16))
+    PREDICTION_FETCH_DEADLINE = float(os.getenv('PREDICTION_FETCH_DEADLINE', 6.0))  # Per country
+    # Separate, smaller pool for background / bulk predictions (snapshot refresh, batch endpoint)
+    BULK_FETCH_WORKERS = int(os.getenv('BULK_FETCH_WORKERS', 8))
+    
+    # Serve WHO lag features from the local bulk store (python -m services.who_store)
+    WHO_STORE_ENABLED = os.getenv('WHO_STORE_ENABLED', 'true').lower() == 'true'
+    # A missing dump, or one older than this, is refreshed in the background (retried after failures)
+    WHO_STORE_MAX_AGE = int(os.getenv('WHO_STORE_MAX_AGE', 7 * 24 * 3600))
+    WHO_STORE_RETRY_INTERVAL = int(os.getenv('WHO_STORE_RETRY_INTERVAL', 300))
+    
+    # Serve lag / rolling features from the offline store (python -m services.feature_store)
+    FEATURE_STORE_ENABLED = os.getenv('FEATURE_STORE_ENABLED', 'true').lower() == 'true'
+    
+    # All-pairs safest-path index (seconds before a background rebuild)
+    PATH_INDEX_ENABLED = os.getenv('PATH_INDEX_ENABLED', 'true').lower() == 'true'
+    PATH_INDEX_TTL = int(os.getenv('PATH_INDEX_TTL', 600))
+    
+    # Background global risk snapshot (seconds)
+    SNAPSHOT_ENABLED = os.getenv('SNAPSHOT_ENABLED', 'true').lower() == 'true'
+    SNAPSHOT_MAX_AGE = int(os.getenv('SNAPSHOT_MAX_AGE', 900))
+    SNAPSHOT_REFRESH_INTERVAL = int(os.getenv('SNAPSHOT_REFRESH_INTERVAL', 600))
+    
+    # Inference engine: 'fused' (memory-mapped artifact, scalers folded into the weights),
+    # 'numpy' (forward pass from the .h5 weights + sklearn scalers) or 'keras' (TensorFlow)
+    INFERENCE_ENGINE = os.getenv('INFERENCE_ENGINE', 'fused').lower()
+    MODEL_ARTIFACT_PATH = os.getenv('MODEL_ARTIFACT_PATH', os.path.join(DATA_DIR, 'model_artifact.bin'))
+    
+    # Load and warm the model in a background thread so the app serves /healthz immediately;
+    # set to false to load during import (e.g. preload before forking workers)
+    MODEL_BACKGROUND_LOAD = os.getenv('MODEL_BACKGROUND_LOAD', 'true').lower() == 'true'
+    
+    # Micro-batching: concurrent predictions wait up to the window to share one forward pass
+    INFERENCE_BATCHING_ENABLED = os.getenv('INFERENCE_BATCHING_ENABLED', 'true').lower() == 'true'
+    INFERENCE_BATCH_WINDOW_MS = float(os.getenv('INFERENCE_BATCH_WINDOW_MS', 3.0))
+    INFERENCE_MAX_BATCH = int(os.getenv('INFERENCE_MAX_BATCH', 256))
+    
+    # Merge identical in-flight predictions (same country and feature epoch) into one computation
+    PREDICTION_COALESCING_ENABLED = os.getenv('PREDICTION_COALESCING_ENABLED', 'true').lower() == 'true'
+    
+    # Prediction log writer: rows are queued and written in batches by a background thread
+    LOG_WRITE_BEHIND = os.getenv('LOG_WRITE_BEHIND', 'true').lower() == 'true'
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+    LOG_BATCH_SIZE = int(os.getenv('LOG_BATCH_SIZE', 500))
+    LOG_FLUSH_INTERVAL = float(os.getenv('LOG_FLUSH_INTERVAL', 0.5))
+    LOG_OVERFLOW_POLICY = os.getenv('LOG_OVERFLOW_POLICY', 'drop_oldest')  # drop_oldest | drop_new | block
+    LOG_READ_POOL_SIZE = int(os.getenv('LOG_READ_POOL_SIZE', 4))  # Idle read connections kept open
+    
+    # Prediction logs are partitioned by month; partitions older than this are dropped.
+    # Opt-in: 0 (default) keeps everything, including the pre-partitioning prediction_logs table
+    LOG_RETENTION_MONTHS = int(os.getenv('LOG_RETENTION_MONTHS', 0))
@@ -0,0 +1,118 @@
+"""
+Compact encoding of the logged feature vector.
+
+The named features are stored as a float32 blob in the order of a versioned
+feature schema (table feature_schema). The country / region one-hot features
+are not stored in the blob: the active ones are rebuilt from the typed
+country_encoded and region columns and zero ones are implied (older rows logged
+every one-hot column). Feature dicts that can't be encoded this way (other
+one-hot keys set, non-numeric values) keep the JSON encoding.
+"""
+import json
+import math
+from datetime import datetime
+import numpy as np
+
+ONEHOT_PREFIXES = ('country_', 'region_')
+
+SCHEMA_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS feature_schema (
+        version INTEGER PRIMARY KEY AUTOINCREMENT,
+        columns_json TEXT NOT NULL UNIQUE,
+        created_at TEXT NOT NULL
+    )
+'''
+
+# Columns added to prediction_logs for the compact encoding
+LOG_COLUMNS = [('features_blob', 'BLOB'), ('feature_schema_version', 'INTEGER')]
+
+
+def ensure_schema(conn):
+    """Create feature_schema and add the blob columns to prediction_logs if missing"""
+    conn.execute(SCHEMA_TABLE_SQL)
+    existing = {row[1] for row in conn.execute('PRAGMA table_info(prediction_logs)')}
+    for name, kind in LOG_COLUMNS:
+        if name not in existing:
+            conn.execute(f'ALTER TABLE prediction_logs ADD COLUMN {name} {kind}')
+    conn.commit()
+
+
+def onehot_names(region, country_encoded):
+    """One-hot feature names implied by the typed region / country_encoded columns"""
+    names = []
+    if country_encoded:
+        names.append(f'country_{country_encoded}')
+    if region:
+        names.append(f'region_{region}')
+    return names
+
+
+def split_features(features_dict, region, country_encoded):
+    """
+    (schema columns, values) for the blob, or None if the dict can't be encoded
+    losslessly (then it is stored as JSON).
+    """
+    expected_onehots = set(onehot_names(region, country_encoded))
+    active_onehots = set()
+    columns, values = [], []
+    for key, value in features_dict.items():
+        if key.startswith(ONEHOT_PREFIXES):
+            if value == 1:
+                active_onehots.add(key)
+            elif value != 0:
+                return None
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return None
+        columns.append(key)
+        values.append(value)
+    if active_onehots != expected_onehots:
+        return None
+    return tuple(columns), values
+
+
+def encode_values(values):
+    return np.asarray(values, dtype='<f4').tobytes()
+
+
+def decode_blob(blob, columns, region, country_encoded):
+    """Feature dict from a stored blob (NaN entries are skipped)"""
+    values = np.frombuffer(blob, dtype='<f4').tolist()
+    features = {name: value for name, value in zip(columns, values) if not math.isnan(value)}
+    for name in ('year', 'month', 'quarter'):
+        if name in features:
+            features[name] = int(features[name])
+    for name in onehot_names(region, country_encoded):
+        features[name] = 1.0
+    return features
+
+
+class FeatureSchemaRegistry:
+    """In-memory view of feature_schema; new column layouts get the next version"""
+    def __init__(self):
+        self.columns = {}    # version -> tuple of column names
+        self.versions = {}   # tuple of column names -> version
+
+    def load(self, conn):
+        for version, columns_json in conn.execute('SELECT version, columns_json FROM feature_schema'):
+            columns = tuple(json.loads(columns_json))
+            self.columns[version] = columns
+            self.versions[columns] = version
+
+    def version_for(self, conn, columns):
+        """Schema version for a column layout, registering it if new"""
+        version = self.versions.get(columns)
+        if version is None:
+            conn.execute('INSERT OR IGNORE INTO feature_schema (columns_json, created_at) VALUES (?, ?)',
+                         (json.dumps(list(columns)), datetime.now().isoformat()))
+            conn.commit()
+            version = conn.execute('SELECT version FROM feature_schema WHERE columns_json = ?',
+                                   (json.dumps(list(columns)),)).fetchone()[0]
+            self.columns[version] = columns
+            self.versions[columns] = version
+        return version
+
+    def get_columns(self, conn, version):
+        if version not in self.columns:
+            self.load(conn)
+        return self.columns[version]
@@ -0,0 +1,428 @@
+"""
+Monthly partitions and daily rollups for prediction logs.
+
+Rows live in one table per month (prediction_logs_YYYYMM); the original
+prediction_logs table is kept as the oldest partition. Each partition's ids
+start at YYYYMM * ID_SPAN (seeded through sqlite_sequence), so ids stay unique
+and increasing across partitions and an id tells which table holds it.
+Retention drops whole partitions instead of deleting rows.
+
+prediction_rollup_daily keeps per-day, per-country aggregates (count, sum / min /
+max of predicted cases, risk-level histogram, feature sums). It is updated in
+the same transaction as each batch of inserts and is not subject to retention,
+so statistics (rollup_stats) never scan detail rows.
+"""
+from datetime import datetime
+
+LEGACY_TABLE = 'prediction_logs'
+PARTITION_PREFIX = 'prediction_logs_'
+PARTITION_GLOB = PARTITION_PREFIX + '[0-9]' * 6
+ID_SPAN = 1_000_000_000
+ROLLUP_TABLE = 'prediction_rollup_daily'
+# Last id handed out by each dropped log table: a recreated table continues after it
+WATERMARK_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS prediction_log_id_watermarks (
+        name TEXT PRIMARY KEY,
+        seq INTEGER NOT NULL
+    )
+'''
+
+INSERT_COLUMNS = [
+    'timestamp', 'country',
+    'avg_temp_c', 'precipitation_mm', 'humidity_pct',
+    'vector_index', 'water_stagnation_index', 'air_quality_index', 'uv_index',
+    'population_density', 'healthcare_budget',
+    'year', 'month',
+    'malaria_lag_1', 'malaria_lag_2', 'malaria_lag_3', 'malaria_lag_6', 'malaria_lag_12',
+    'malaria_roll_mean_3', 'malaria_roll_mean_6', 'malaria_roll_mean_12',
+    'malaria_roll_std_3', 'malaria_roll_std_6', 'malaria_roll_std_12',
+    'region', 'country_encoded',
+    'predicted_malaria', 'predicted_dengue', 'risk_level',
+    'all_features_json', 'features_blob', 'feature_schema_version'
+]
+_COL = {name: i for i, name in enumerate(INSERT_COLUMNS)}
+
+RISK_COLUMNS = {'Low': 'risk_low', 'Medium': 'risk_medium', 'High': 'risk_high'}
+
+# Drift windows: bucket expression over the rollup day (weeks start on Monday)
+STATS_WINDOWS = {'day': 'day', 'week': "date(day, '-6 days', 'weekday 1')", 'month': 'substr(day, 1, 7)'}
+
+ROLLUP_KEY = ['day', 'country', 'region']
+# Rollup metrics: (column, type, how two values merge, aggregate over detail rows)
+ROLLUP_METRICS = [
+    ('predictions', 'INTEGER NOT NULL DEFAULT 0', 'sum', 'COUNT(*)'),
+    ('malaria_sum', 'REAL NOT NULL DEFAULT 0', 'sum', 'TOTAL(predicted_malaria)'),
+    ('malaria_min', 'REAL', 'min', 'MIN(predicted_malaria)'),
+    ('malaria_max', 'REAL', 'max', 'MAX(predicted_malaria)'),
+    ('dengue_sum', 'REAL NOT NULL DEFAULT 0', 'sum', 'TOTAL(predicted_dengue)'),
+    ('dengue_min', 'REAL', 'min', 'MIN(predicted_dengue)'),
+    ('dengue_max', 'REAL', 'max', 'MAX(predicted_dengue)'),
+    ('risk_low', 'INTEGER NOT NULL DEFAULT 0', 'sum', "SUM(risk_level = 'Low')"),
+    ('risk_medium', 'INTEGER NOT NULL DEFAULT 0', 'sum', "SUM(risk_level = 'Medium')"),
+    ('risk_high', 'INTEGER NOT NULL DEFAULT 0', 'sum', "SUM(risk_level = 'High')"),
+    ('risk_other', 'INTEGER NOT NULL DEFAULT 0', 'sum',
+     "SUM(risk_level IS NULL OR risk_level NOT IN ('Low', 'Medium', 'High'))"),
+    # Feature sums: per-window means give the drift of the model inputs. feature_rows counts
+    # the rows in the sums (0 on rollups that predate them)
+    ('feature_rows', 'INTEGER NOT NULL DEFAULT 0', 'sum', 'COUNT(*)'),
+    ('temp_sum', 'REAL NOT NULL DEFAULT 0', 'sum', 'TOTAL(avg_temp_c)'),
+    ('humidity_sum', 'REAL NOT NULL DEFAULT 0', 'sum', 'TOTAL(humidity_pct)')
+]
+
+
+def create_log_table(conn, name):
+    """Create a log table (legacy or partition) with its pagination indexes"""
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            country TEXT NOT NULL,
+
+            -- Environmental Features
+            avg_temp_c REAL,
+            precipitation_mm REAL,
+            humidity_pct REAL,
+
+            -- Derived Environmental
+            vector_index REAL,
+            water_stagnation_index REAL,
+            air_quality_index REAL,
+            uv_index REAL,
+
+            -- Population & Health
+            population_density REAL,
+            healthcare_budget REAL,
+
+            -- Time Features
+            year INTEGER,
+            month INTEGER,
+
+            -- Lag Features (Malaria)
+            malaria_lag_1 REAL,
+            malaria_lag_2 REAL,
+            malaria_lag_3 REAL,
+            malaria_lag_6 REAL,
+            malaria_lag_12 REAL,
+
+            -- Rolling Statistics (Malaria)
+            malaria_roll_mean_3 REAL,
+            malaria_roll_mean_6 REAL,
+            malaria_roll_mean_12 REAL,
+            malaria_roll_std_3 REAL,
+            malaria_roll_std_6 REAL,
+            malaria_roll_std_12 REAL,
+
+            -- Region & Country (stored as text for readability)
+            region TEXT,
+            country_encoded TEXT,
+
+            -- Predictions
+            predicted_malaria INTEGER,
+            predicted_dengue INTEGER,
+            risk_level TEXT,
+
+            -- Complete feature vector (JSON, or compact blob + schema version)
+            all_features_json TEXT,
+            features_blob BLOB,
+            feature_schema_version INTEGER
+        )
+    ''')
+    # Keyset pagination walks these indexes (rowid breaks timestamp ties)
+    conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{name}_timestamp ON {name} (timestamp)')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{name}_country_timestamp ON {name} (country, timestamp)')
+
+
+def insert_sql(table):
+    return f'''
+        INSERT INTO {table} ({', '.join(INSERT_COLUMNS)})
+        VALUES ({', '.join('?' * len(INSERT_COLUMNS))})
+    '''
+
+
+def month_key(timestamp):
+    """'2026-10-16T...' -> 202610"""
+    return int(timestamp[:4] + timestamp[5:7])
+
+
+def partition_name(month):
+    return f'{PARTITION_PREFIX}{month}'
+
+
+def partition_month(table):
+    """Month of a partition table, or None for the legacy table"""
+    return int(table[len(PARTITION_PREFIX):]) if table != LEGACY_TABLE else None
+
+
+def table_for_id(log_id):
+    return partition_name(log_id // ID_SPAN) if log_id >= ID_SPAN else LEGACY_TABLE
+
+
+def list_tables(conn):
+    """All log tables, oldest first (the legacy table, then partitions by month)"""
+    partitions = sorted(row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB ?", (PARTITION_GLOB,)))
+    legacy = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (LEGACY_TABLE,)).fetchone()
+    return ([LEGACY_TABLE] if legacy else []) + partitions
+
+
+def _seed_sequence(conn, name, floor):
+    """Start a (re)created table's AUTOINCREMENT after floor and after any id it handed out before"""
+    conn.execute(WATERMARK_TABLE_SQL)
+    conn.execute('''
+        INSERT INTO sqlite_sequence (name, seq)
+        SELECT ?, MAX(?, COALESCE((SELECT seq FROM prediction_log_id_watermarks WHERE name = ?), 0))
+        WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = ?)
+    ''', (name, floor, name, name))
+
+
+def ensure_partition(conn, month):
+    """Create the partition for a month (if needed) with ids starting at month * ID_SPAN"""
+    name = partition_name(month)
+    create_log_table(conn, name)
+    _seed_sequence(conn, name, month * ID_SPAN)
+    return name
+
+
+def drop_log_table(conn, table):
+    """
+    Drop a log table, remembering the last id it handed out so ids are never reused
+    (old page cursors must not point at new rows). The legacy table is recreated empty.
+    """
+    conn.execute(WATERMARK_TABLE_SQL)
+    conn.execute('''
+        INSERT INTO prediction_log_id_watermarks (name, seq)
+        SELECT name, seq FROM sqlite_sequence WHERE name = ?
+        ON CONFLICT (name) DO UPDATE SET seq = MAX(seq, excluded.seq)
+    ''', (table,))
+    conn.execute(f'DROP TABLE {table}')
+    if table == LEGACY_TABLE:
+        create_log_table(conn, LEGACY_TABLE)
+        _seed_sequence(conn, LEGACY_TABLE, 0)
+
+
+def _month_index(month):
+    return (month // 100) * 12 + month % 100 - 1
+
+
+def drop_expired_partitions(conn, retention_months, now=None):
+    """
+    Drop partitions older than retention_months (counting the current month as 1) and
+    empty the legacy table once all of its rows are that old. Returns the dropped tables.
+    """
+    if not retention_months or retention_months <= 0:
+        return []
+    now = now or datetime.now()
+    oldest_kept = now.year * 12 + now.month - 1 - (retention_months - 1)
+    dropped = []
+    for table in list_tables(conn):
+        month = partition_month(table)
+        if month is None:
+            newest = conn.execute(f'SELECT MAX(timestamp) FROM {LEGACY_TABLE}').fetchone()[0]
+            if newest is None or _month_index(month_key(newest)) >= oldest_kept:
+                continue
+        elif _month_index(month) >= oldest_kept:
+            continue
+        rows = conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+        print(f"WARNING: Log retention (LOG_RETENTION_MONTHS={retention_months}) is dropping {table}: "
+              f"{rows} prediction logs older than {retention_months} months are deleted")
+        drop_log_table(conn, table)
+        dropped.append(table)
+    if dropped:
+        conn.commit()
+        conn.execute('PRAGMA incremental_vacuum')
+        print(f"Log retention: dropped {', '.join(dropped)}")
+    return dropped
+
+
+def _merge_sql(name, merge):
+    """ON CONFLICT assignment folding excluded.<name> into the stored value"""
+    if merge == 'sum':
+        return f'{name} = {name} + excluded.{name}'
+    return f'{name} = {merge.upper()}(COALESCE({name}, excluded.{name}), COALESCE(excluded.{name}, {name}))'
+
+
+def _rollup_upsert(source_sql):
+    columns = ', '.join(ROLLUP_KEY + [m[0] for m in ROLLUP_METRICS])
+    return f'''
+        INSERT INTO {ROLLUP_TABLE} ({columns})
+        {source_sql}
+        ON CONFLICT (day, country) DO UPDATE SET
+            region = COALESCE(excluded.region, region),
+            {', '.join(_merge_sql(name, merge) for name, _, merge, _ in ROLLUP_METRICS)}
+    '''
+
+
+def _backfill_rollups(conn, since_day=None):
+    """Aggregate detail rows (from since_day on) into the rollup table"""
+    aggregates = ', '.join(m[3] for m in ROLLUP_METRICS)
+    for table in list_tables(conn):
+        conn.execute(_rollup_upsert(f'''
+            SELECT substr(timestamp, 1, 10), country, MAX(region), {aggregates}
+            FROM {table} WHERE timestamp >= ? GROUP BY 1, 2
+        '''), (since_day or '',))
+
+
+def ensure_rollup(conn):
+    """
+    Create the daily rollup table (backfilled from existing logs). When an older table
+    lacks metric columns they are added and the days still covered by detail rows are
+    recomputed; earlier days keep NULL for the new metrics.
+    """
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (ROLLUP_TABLE,)).fetchone()
+    if not exists:
+        conn.execute(f'''
+            CREATE TABLE {ROLLUP_TABLE} (
+                day TEXT NOT NULL,
+                country TEXT NOT NULL,
+                region TEXT,
+                {', '.join(f'{name} {kind}' for name, kind, _, _ in ROLLUP_METRICS)},
+                PRIMARY KEY (day, country)
+            ) WITHOUT ROWID
+        ''')
+        _backfill_rollups(conn)
+        conn.commit()
+        return
+    existing = {row[1] for row in conn.execute(f'PRAGMA table_info({ROLLUP_TABLE})')}
+    missing = [(name, kind) for name, kind, _, _ in ROLLUP_METRICS if name not in existing]
+    if missing:
+        for name, kind in missing:
+            conn.execute(f'ALTER TABLE {ROLLUP_TABLE} ADD COLUMN {name} {kind}')
+        tables = list_tables(conn)
+        first_day = min(filter(None, (conn.execute(f'SELECT MIN(timestamp) FROM {t}').fetchone()[0] for t in tables)),
+                        default=None)
+        if first_day:
+            first_day = first_day[:10]
+            conn.execute(f'DELETE FROM {ROLLUP_TABLE} WHERE day >= ?', (first_day,))
+            _backfill_rollups(conn, first_day)
+    conn.commit()
+
+
+def update_rollups(conn, rows):
+    """Fold a batch of inserted rows (INSERT_COLUMNS tuples) into the daily rollups"""
+    groups = {}
+    for row in rows:
+        key = (row[_COL['timestamp']][:10], row[_COL['country']])
+        values = _row_metrics(row)
+        agg = groups.get(key)
+        if agg is None:
+            groups[key] = [row[_COL['region']]] + values
+            continue
+        agg[0] = agg[0] or row[_COL['region']]
+        for i, (_, _, merge, _) in enumerate(ROLLUP_METRICS, start=1):
+            if values[i - 1] is None:
+                continue
+            if agg[i] is None:
+                agg[i] = values[i - 1]
+            elif merge == 'sum':
+                agg[i] += values[i - 1]
+            else:
+                agg[i] = (min if merge == 'min' else max)(agg[i], values[i - 1])
+    placeholders = ', '.join('?' * (len(ROLLUP_KEY) + len(ROLLUP_METRICS)))
+    conn.executemany(_rollup_upsert(f'VALUES ({placeholders})'),
+                     [key + tuple(agg) for key, agg in groups.items()])
+
+
+def _row_metrics(row):
+    """Per-row contribution to each ROLLUP_METRICS column"""
+    malaria, dengue = row[_COL['predicted_malaria']], row[_COL['predicted_dengue']]
+    risk = RISK_COLUMNS.get(row[_COL['risk_level']], 'risk_other')
+    contributions = {
+        'predictions': 1,
+        'malaria_sum': malaria or 0, 'malaria_min': malaria, 'malaria_max': malaria,
+        'dengue_sum': dengue or 0, 'dengue_min': dengue, 'dengue_max': dengue,
+        'risk_low': 0, 'risk_medium': 0, 'risk_high': 0, 'risk_other': 0,
+        'feature_rows': 1, 'temp_sum': row[_COL['avg_temp_c']] or 0, 'humidity_sum': row[_COL['humidity_pct']] or 0
+    }
+    contributions[risk] = 1
+    return [contributions[name] for name, _, _, _ in ROLLUP_METRICS]
+
+
+def _mean(total, count):
+    return round(total / count, 3) if count and total is not None else None
+
+
+def _summary(agg):
+    """JSON shape of one aggregated group"""
+    return {
+        'predictions': agg['predictions'],
+        'predicted_malaria': {'mean': _mean(agg['malaria_sum'], agg['predictions']),
+                              'min': agg['malaria_min'], 'max': agg['malaria_max']},
+        'predicted_dengue': {'mean': _mean(agg['dengue_sum'], agg['predictions']),
+                             'min': agg['dengue_min'], 'max': agg['dengue_max']},
+        'risk_levels': {level: agg[column] for level, column in
+                        list(RISK_COLUMNS.items()) + [('Other', 'risk_other')]},
+        'avg_temp_c': _mean(agg['temp_sum'], agg['feature_rows']),
+        'humidity_pct': _mean(agg['humidity_sum'], agg['feature_rows'])
+    }
+
+
+def _combine(into, agg):
+    for name, _, merge, _ in ROLLUP_METRICS:
+        if agg[name] is None:
+            continue
+        if into.get(name) is None:
+            into[name] = agg[name]
+        elif merge == 'sum':
+            into[name] += agg[name]
+        else:
+            into[name] = (min if merge == 'min' else max)(into[name], agg[name])
+    return into
+
+
+def rollup_stats(conn, since=None, until=None, country=None, region=None, window='day'):
+    """
+    Aggregates from the daily rollups only (no detail scans): totals, per country,
+    per region, and per time window (feature drift of avg_temp_c / humidity_pct).
+    since / until are dates (inclusive / exclusive); window is a STATS_WINDOWS key.
+    """
+    if window not in STATS_WINDOWS:
+        raise ValueError(f"Unknown window '{window}' (use {', '.join(STATS_WINDOWS)})")
+    where, params = [], []
+    if since:
+        where.append('day >= ?'); params.append(since)
+    if until:
+        where.append('day < ?'); params.append(until)
+    if country:
+        where.append('country = ?'); params.append(country)
+    if region:
+        where.append('region = ?'); params.append(region)
+    where_sql = 'WHERE ' + ' AND '.join(where) if where else ''
+    aggregates = ', '.join(f"{merge.upper() if merge != 'sum' else 'TOTAL'}({name}) AS {name}"
+                           for name, _, merge, _ in ROLLUP_METRICS)
+
+    countries, regions, totals = [], {}, {}
+    for row in conn.execute(f'''
+        SELECT country, MAX(region) AS region, {aggregates} FROM {ROLLUP_TABLE}
+        {where_sql} GROUP BY country ORDER BY country
+    ''', params):
+        agg = {name: int(value) if kind.startswith('INTEGER') else value
+               for (name, kind, _, _), value in zip(ROLLUP_METRICS, row[2:])}
+        countries.append(dict(country=row[0], region=row[1], **_summary(agg)))
+        _combine(regions.setdefault(row[1], {}), agg)
+        _combine(totals, agg)
+
+    windows = []
+    for row in conn.execute(f'''
+        SELECT {STATS_WINDOWS[window]} AS bucket, TOTAL(predictions), TOTAL(feature_rows),
+               TOTAL(temp_sum), TOTAL(humidity_sum)
+        FROM {ROLLUP_TABLE} {where_sql} GROUP BY bucket ORDER BY bucket
+    ''', params):
+        windows.append({'window': row[0], 'predictions': int(row[1]),
+                        'avg_temp_c': _mean(row[3], row[2]), 'humidity_pct': _mean(row[4], row[2])})
+
+    drift = {'window': window, 'windows': windows}
+    for feature in ('avg_temp_c', 'humidity_pct'):
+        means = [w[feature] for w in windows if w[feature] is not None]
+        drift[feature] = {
+            'first': means[0] if means else None,
+            'last': means[-1] if means else None,
+            'change': round(means[-1] - means[0], 3) if means else None,
+            'min': min(means, default=None),
+            'max': max(means, default=None)
+        }
+    return {
+        'totals': _summary(totals) if totals else None,
+        'countries': countries,
+        'regions': [dict(region=name, **_summary(agg)) for name, agg in sorted(regions.items(), key=lambda r: r[0] or '')],
+        'drift': drift
+    }
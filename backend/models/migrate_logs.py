@@ -0,0 +1,71 @@
+"""
+Migrate prediction_logs rows from the JSON feature column to the compact encoding.
+
+Rows whose all_features_json can be encoded are rewritten to features_blob +
+feature_schema_version and their JSON is cleared; rows that can't (see
+models.feature_codec) keep their JSON. Safe to re-run; it resumes where it left off.
+
+Run with:  python -m models.migrate_logs [db_path] [--batch N] [--vacuum]
+"""
+import argparse
+import json
+import os
+import sqlite3
+from models.feature_codec import FeatureSchemaRegistry, ensure_schema, split_features, encode_values
+from models.prediction_log import PredictionLogger
+
+
+def migrate(db_path, batch_size=1000, vacuum=False):
+    before = os.path.getsize(db_path)
+    conn = sqlite3.connect(db_path)
+    ensure_schema(conn)
+    schemas = FeatureSchemaRegistry()
+    schemas.load(conn)
+
+    migrated = kept = 0
+    last_id = 0
+    while True:
+        rows = conn.execute('''
+            SELECT id, all_features_json, region, country_encoded FROM prediction_logs
+            WHERE id > ? AND features_blob IS NULL AND all_features_json IS NOT NULL
+            ORDER BY id LIMIT ?
+        ''', (last_id, batch_size)).fetchall()
+        if not rows:
+            break
+        updates = []
+        for row_id, raw_json, region, country_encoded in rows:
+            try:
+                split = split_features(json.loads(raw_json), region, country_encoded)
+            except ValueError:
+                split = None
+            if split is None:
+                kept += 1
+                continue
+            columns, values = split
+            updates.append((encode_values(values), schemas.version_for(conn, columns), row_id))
+        with conn:
+            conn.executemany('''
+                UPDATE prediction_logs
+                SET features_blob = ?, feature_schema_version = ?, all_features_json = NULL
+                WHERE id = ?
+            ''', updates)
+        migrated += len(updates)
+        last_id = rows[-1][0]
+        print(f"  migrated {migrated} rows (up to id {last_id})")
+
+    if vacuum:
+        conn.execute('VACUUM')
+    conn.close()
+    after = os.path.getsize(db_path)
+    print(f"Migrated {migrated} rows, kept JSON for {kept}; {len(schemas.columns)} feature schema(s); "
+          f"file {before} -> {after} bytes" + ('' if vacuum else ' (run with --vacuum to reclaim space)'))
+    return migrated, kept
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('db_path', nargs='?', default=PredictionLogger(write_behind=False).db_path)
+    parser.add_argument('--batch', type=int, default=1000)
+    parser.add_argument('--vacuum', action='store_true', help='VACUUM afterwards to shrink the file')
+    args = parser.parse_args()
+    migrate(args.db_path, args.batch, args.vacuum)
@@ -1,76 +1,145 @@
 """
 Database model for logging prediction features
+
+Writes are write-behind: log_prediction() only builds the row and puts it on a
+bounded in-memory queue; a background writer drains the queue and inserts rows
+in batched transactions (executemany) on one WAL-mode connection. The queue is
+flushed on shutdown.
+
+The full feature vector is stored compactly (models.feature_codec) and only
+decoded when a caller asks for raw features.
+
+Rows are routed to monthly partition tables and folded into daily per-country
+rollups in the same transaction (models.log_partitions); retention drops whole
+partitions.
 """
+import atexit
+import queue
 import sqlite3
 import json
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 import os
+from config import Config
+from models.feature_codec import (
+    FeatureSchemaRegistry, ensure_schema, split_features, encode_values, decode_blob
+)
+from models.log_partitions import (
+    LEGACY_TABLE, create_log_table, insert_sql, month_key, partition_name, partition_month, table_for_id,
+    list_tables, ensure_partition, drop_log_table, drop_expired_partitions, ensure_rollup, update_rollups, rollup_stats, ROLLUP_TABLE
+)
+
+# Applied to every connection; journal_mode=WAL is persistent and set once in _init_db
+CONNECTION_PRAGMAS = [
+    'PRAGMA synchronous=NORMAL',   # WAL + NORMAL: no fsync per commit, still crash-safe
+    'PRAGMA busy_timeout=5000',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-8000'      # ~8 MB page cache
+]
+
+OVERFLOW_POLICIES = ('drop_oldest', 'drop_new', 'block')
+
+# Typed columns returned by the log queries (the encoded feature vector is decoded on request)
+LOG_FIELDS = [
+    'id', 'timestamp', 'country',
+    'avg_temp_c', 'precipitation_mm', 'humidity_pct',
+    'vector_index', 'water_stagnation_index', 'air_quality_index', 'uv_index',
+    'population_density', 'healthcare_budget',
+    'year', 'month',
+    'malaria_lag_1', 'malaria_lag_2', 'malaria_lag_3', 'malaria_lag_6', 'malaria_lag_12',
+    'malaria_roll_mean_3', 'malaria_roll_mean_6', 'malaria_roll_mean_12',
+    'malaria_roll_std_3', 'malaria_roll_std_6', 'malaria_roll_std_12',
+    'region', 'country_encoded',
+    'predicted_malaria', 'predicted_dengue', 'risk_level'
+]
+FEATURE_FIELDS = ['all_features_json', 'features_blob', 'feature_schema_version']
+MAX_PAGE_SIZE = 1000
+
+class _FlushMarker:
+    """
+    Queued behind pending rows; set once everything before it is written. An optional
+    action(conn) then runs on the writer's connection (e.g. clearing the logs).
+    """
+    def __init__(self, action=None):
+        self.event = threading.Event()
+        self.action = action
+        self.error = None
+
 
 class PredictionLogger:
-    def __init__(self, db_path='prediction_logs.db'):
+    def __init__(self, db_path='prediction_logs.db', write_behind=None, queue_size=None,
+                 batch_size=None, flush_interval=None, overflow=None, retention_months=None):
         self.db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), db_path)
+        self.write_behind = Config.LOG_WRITE_BEHIND if write_behind is None else write_behind
+        self.batch_size = batch_size or Config.LOG_BATCH_SIZE
+        self.flush_interval = flush_interval or Config.LOG_FLUSH_INTERVAL
+        self.overflow = overflow or Config.LOG_OVERFLOW_POLICY
+        self.retention_months = Config.LOG_RETENTION_MONTHS if retention_months is None else retention_months
+        if self.overflow not in OVERFLOW_POLICIES:
+            print(f"Unknown LOG_OVERFLOW_POLICY '{self.overflow}', using drop_oldest")
+            self.overflow = 'drop_oldest'
+        self._queue = queue.Queue(maxsize=queue_size or Config.LOG_QUEUE_SIZE)
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._closed = False
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.errors = 0
+        self.partitions_dropped = 0
+        self._partitions = set()  # Partition months known to exist (writer side)
+        self._partitions_lock = threading.Lock()
+        self.schemas = FeatureSchemaRegistry()
+        self._schema_lock = threading.Lock()
+        self._readers = queue.LifoQueue(maxsize=Config.LOG_READ_POOL_SIZE)  # Idle read connections
         self._init_db()
+
+    def _connect(self, **kwargs):
+        conn = sqlite3.connect(self.db_path, **kwargs)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _open_reader(self):
+        conn = self._connect(check_same_thread=False)  # Pooled connections move between threads
+        conn.execute('PRAGMA query_only=1')
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def _read_connection(self):
+        """
+        A read-only connection from the pool (opened when none is idle). It goes back to the
+        pool afterwards; beyond LOG_READ_POOL_SIZE idle connections it is closed instead.
+        """
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            conn = self._open_reader()
+        try:
+            yield conn
+        finally:
+            try:
+                self._readers.put_nowait(conn)
+            except queue.Full:
+                conn.close()
     
     def _init_db(self):
         """Initialize the database and create tables if they don't exist"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS prediction_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
-                country TEXT NOT NULL,
-                
-                -- Environmental Features
-                avg_temp_c REAL,
-                precipitation_mm REAL,
-                humidity_pct REAL,
-                
-                -- Derived Environmental
-                vector_index REAL,
-                water_stagnation_index REAL,
-                air_quality_index REAL,
-                uv_index REAL,
-                
-                -- Population & Health
-                population_density REAL,
-                healthcare_budget REAL,
-                
-                -- Time Features
-                year INTEGER,
-                month INTEGER,
-                
-                -- Lag Features (Malaria)
-                malaria_lag_1 REAL,
-                malaria_lag_2 REAL,
-                malaria_lag_3 REAL,
-                malaria_lag_6 REAL,
-                malaria_lag_12 REAL,
-                
-                -- Rolling Statistics (Malaria)
-                malaria_roll_mean_3 REAL,
-                malaria_roll_mean_6 REAL,
-                malaria_roll_mean_12 REAL,
-                malaria_roll_std_3 REAL,
-                malaria_roll_std_6 REAL,
-                malaria_roll_std_12 REAL,
-                
-                -- Region & Country (stored as text for readability)
-                region TEXT,
-                country_encoded TEXT,
-                
-                -- Predictions
-                predicted_malaria INTEGER,
-                predicted_dengue INTEGER,
-                risk_level TEXT,
-                
-                -- Complete feature vector (JSON)
-                all_features_json TEXT
-            )
-        ''')
+        conn = self._connect()
+        # Only takes effect on a new database; lets dropped partitions return their pages
+        conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        conn.execute('PRAGMA journal_mode=WAL')
         
+        # Pre-partitioning table; kept as the oldest partition
+        create_log_table(conn, LEGACY_TABLE)
         conn.commit()
+        # Compact feature encoding: blob columns + feature_schema table
+        ensure_schema(conn)
+        self.schemas.load(conn)
+        ensure_rollup(conn)
+        self._apply_retention(conn)
         conn.close()
     
     def log_prediction(self, country, features_dict, predictions):
@@ -81,10 +150,22 @@ class PredictionLogger:
             country: Country name
             features_dict: Dictionary of all features sent to model
             predictions: Dictionary with malaria, dengue, risk_level
-        """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
         
+        Returns True once the row is queued (write-behind; False if it was dropped on
+        overflow), or the new row id when write-behind is disabled.
+        """
+        row = self._build_row(country, features_dict, predictions)
+        if not self.write_behind:
+            conn = self._connect()
+            try:
+                return self._insert_rows(conn, [self._finalize_row(conn, row)])
+            finally:
+                conn.close()
+        return self._enqueue(row)
+
+    @staticmethod
+    def _build_row(country, features_dict, predictions):
+        """(typed column values, schema columns or None, blob or JSON) for one prediction"""
         # Extract region from features if available
         region = None
         for key in features_dict:
@@ -99,21 +180,7 @@ class PredictionLogger:
                 country_encoded = key.replace('country_', '').replace('_', ' ')
                 break
         
-        cursor.execute('''
-            INSERT INTO prediction_logs (
-                timestamp, country,
-                avg_temp_c, precipitation_mm, humidity_pct,
-                vector_index, water_stagnation_index, air_quality_index, uv_index,
-                population_density, healthcare_budget,
-                year, month,
-                malaria_lag_1, malaria_lag_2, malaria_lag_3, malaria_lag_6, malaria_lag_12,
-                malaria_roll_mean_3, malaria_roll_mean_6, malaria_roll_mean_12,
-                malaria_roll_std_3, malaria_roll_std_6, malaria_roll_std_12,
-                region, country_encoded,
-                predicted_malaria, predicted_dengue, risk_level,
-                all_features_json
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        values = (
             datetime.now().isoformat(),
             country,
             features_dict.get('avg_temp_c', 0),
@@ -142,57 +209,333 @@ class PredictionLogger:
             country_encoded,
             predictions.get('malaria', 0),
             predictions.get('dengue', 0),
-            predictions.get('risk_level', 'Unknown'),
-            json.dumps(features_dict, indent=2)
-        ))
-        
-        conn.commit()
-        log_id = cursor.lastrowid
-        conn.close()
-        
-        return log_id
+            predictions.get('risk_level', 'Unknown')
+        )
+        split = split_features(features_dict, region, country_encoded)
+        if split is None:
+            return values, None, json.dumps(features_dict, separators=(',', ':'))
+        columns, feature_values = split
+        return values, columns, encode_values(feature_values)
+
+    def _finalize_row(self, conn, row):
+        """INSERT parameters for a built row, resolving (and registering) its schema version"""
+        values, columns, payload = row
+        if columns is None:
+            return values + (payload, None, None)
+        with self._schema_lock:
+            version = self.schemas.version_for(conn, columns)
+        return values + (None, payload, version)
+
+    def _enqueue(self, item):
+        """Queue a row (or flush marker) for the writer, applying the overflow policy"""
+        self._ensure_writer()
+        if self.overflow == 'block' or isinstance(item, _FlushMarker):
+            self._queue.put(item)
+            return True
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return True
+            except queue.Full:
+                if self.overflow == 'drop_new':
+                    self.dropped += 1
+                    return False
+                try:
+                    dropped = self._queue.get_nowait()  # drop_oldest: make room
+                except queue.Empty:
+                    continue
+                if isinstance(dropped, _FlushMarker):
+                    self._queue.put(dropped)  # never drop a flush request; it only moves later
+                    continue
+                self.dropped += 1
+
+    def _ensure_writer(self):
+        if self._writer is None:
+            with self._writer_lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._run_writer, name='prediction-log-writer', daemon=True)
+                    self._writer.start()
+                    atexit.register(self.close)
+
+    def _run_writer(self):
+        conn = self._connect()
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch, markers, stop = [], [], False
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, _FlushMarker):
+                    markers.append(item)
+                else:
+                    batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            self._write_batch(conn, batch)
+            for marker in markers:
+                if marker.action is not None:
+                    try:
+                        marker.action(conn)
+                    except Exception as e:
+                        marker.error = e
+                marker.event.set()
+            if stop:
+                conn.close()
+                return
+
+    def _write_batch(self, conn, batch):
+        if not batch:
+            return
+        try:
+            rows = [self._finalize_row(conn, row) for row in batch]
+            self._insert_rows(conn, rows)
+            self.written += len(batch)
+            self.batches += 1
+        except Exception as e:
+            self.errors += 1
+            print(f"Warning: Failed to write {len(batch)} prediction logs: {e}")
+
+    def _insert_rows(self, conn, rows):
+        """
+        Insert finalized rows into their month partitions and update the daily rollups,
+        all in one transaction. Returns the id of the last row inserted.
+        """
+        by_month = {}
+        for row in rows:
+            by_month.setdefault(month_key(row[0]), []).append(row)
+        created = False
+        with conn:
+            for month, month_rows in by_month.items():
+                if month not in self._partitions:
+                    ensure_partition(conn, month)
+                    created = True
+                table = partition_name(month)
+                if len(month_rows) == 1:
+                    last_id = conn.execute(insert_sql(table), month_rows[0]).lastrowid
+                else:
+                    conn.executemany(insert_sql(table), month_rows)
+                    last_id = None
+            update_rollups(conn, rows)
+        if created:
+            with self._partitions_lock:
+                self._partitions.update(by_month)
+            self._apply_retention(conn)  # A new month started: partitions may have aged out
+        return last_id
+
+    def _apply_retention(self, conn):
+        dropped = drop_expired_partitions(conn, self.retention_months)
+        if dropped:
+            self.partitions_dropped += len(dropped)
+            with self._partitions_lock:
+                self._partitions.difference_update(partition_month(t) for t in dropped)
+
+    def flush(self, timeout=5.0):
+        """Block until every row queued so far is written (True) or the timeout passes (False)"""
+        if self._writer is None or not self._writer.is_alive():
+            return True
+        marker = _FlushMarker()
+        self._enqueue(marker)
+        return marker.event.wait(timeout)
+
+    def close(self, timeout=5.0):
+        """Flush pending rows and stop the writer (registered with atexit)"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout)
+        while not self._readers.empty():
+            self._readers.get_nowait().close()
+
+    def stats(self):
+        return {
+            'write_behind': self.write_behind,
+            'queued': self._queue.qsize(),
+            'queue_capacity': self._queue.maxsize,
+            'overflow_policy': self.overflow,
+            'written': self.written,
+            'batches': self.batches,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'retention_months': self.retention_months,
+            'partitions_dropped': self.partitions_dropped
+        }
     
-    def get_recent_logs(self, limit=50):
-        """Get recent prediction logs"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT * FROM prediction_logs 
-            ORDER BY timestamp DESC 
-            LIMIT ?
-        ''', (limit,))
-        
-        rows = cursor.fetchall()
-        logs = [dict(row) for row in rows]
-        
-        conn.close()
-        return logs
+    def get_recent_logs(self, limit=50, include_features=False, **page):
+        """Get recent prediction logs (raw feature vectors only with include_features)"""
+        return self.query_logs(limit=limit, include_features=include_features, **page)['logs']
     
-    def get_logs_by_country(self, country, limit=20):
+    def get_logs_by_country(self, country, limit=20, include_features=False, **page):
         """Get logs for a specific country"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT * FROM prediction_logs 
-            WHERE country = ?
-            ORDER BY timestamp DESC 
-            LIMIT ?
-        ''', (country, limit))
+        return self.query_logs(country, limit, include_features=include_features, **page)['logs']
+
+    def query_logs(self, country=None, limit=50, before_id=None, after_id=None, fields=None, include_features=False):
+        """
+        One page of logs, newest first, using keyset pagination over (timestamp, id).
+        Partitions are read newest to oldest (oldest to newest for after_id), starting
+        at the cursor's partition, until the page is full.
         
-        rows = cursor.fetchall()
-        logs = [dict(row) for row in rows]
+        Args:
+            country: only logs for this country
+            before_id / after_id: return the page older / newer than the log with this id
+            fields: subset of LOG_FIELDS to return ('id' is always included)
+            include_features: also decode the raw feature vector into 'features'
         
-        conn.close()
-        return logs
+        Returns {'logs': [...], 'next_before_id': id or None, 'prev_after_id': id or None}
+        """
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        fields = self.select_fields(fields)
+        select = fields + (FEATURE_FIELDS + ['region', 'country_encoded'] if include_features else [])
+        with self._read_connection() as conn:
+            tables = list_tables(conn)
+
+            where, params = [], []
+            if country:
+                where.append('country = ?'); params.append(country)
+            cursor_id, newer = (after_id, True) if after_id is not None else (before_id, False)
+            if cursor_id is not None:
+                cursor_table = table_for_id(cursor_id)
+                anchor = None
+                if cursor_table in tables:
+                    anchor = conn.execute(f'SELECT timestamp FROM {cursor_table} WHERE id = ?', (cursor_id,)).fetchone()
+                if anchor is None:
+                    return {'logs': [], 'next_before_id': None, 'prev_after_id': None}
+                where.append(f"(timestamp, id) {'>' if newer else '<'} (?, ?)")
+                params += [anchor[0], cursor_id]
+                position = tables.index(cursor_table)
+                tables = tables[position:] if newer else tables[:position + 1]
+            order = 'ASC' if newer else 'DESC'
+            if not newer:
+                tables.reverse()
+
+            rows = []
+            for table in tables:
+                rows += conn.execute(f'''
+                    SELECT {', '.join(dict.fromkeys(select))} FROM {table}
+                    {'WHERE ' + ' AND '.join(where) if where else ''}
+                    ORDER BY timestamp {order}, id {order}
+                    LIMIT ?
+                ''', params + [limit + 1 - len(rows)]).fetchall()
+                if len(rows) > limit:
+                    break
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            if newer:
+                rows.reverse()  # Pages are always newest first
+
+            logs = []
+            for row in rows:
+                log = dict(row)
+                if include_features:
+                    log['features'] = self._decode_features(conn, log)
+                    for name in ('region', 'country_encoded'):
+                        if name not in fields:
+                            log.pop(name, None)
+                logs.append(log)
+
+            older_exist = has_more if not newer else cursor_id is not None
+            newer_exist = has_more if newer else cursor_id is not None
+            return {
+                'logs': logs,
+                'next_before_id': logs[-1]['id'] if logs and older_exist else None,
+                'prev_after_id': logs[0]['id'] if logs and newer_exist else None
+            }
+
+    def iter_logs(self, country=None, since=None, until=None, fields=None, include_features=False, batch_size=1000):
+        """
+        Generator over logs in chronological order, for exports of any size: rows are
+        fetched batch_size at a time (fetchmany) on a dedicated connection, so memory
+        stays constant. since / until are ISO timestamps (inclusive / exclusive).
+        """
+        fields = self.select_fields(fields)
+        select = fields + (FEATURE_FIELDS + ['region', 'country_encoded'] if include_features else [])
+        where, params = [], []
+        if country:
+            where.append('country = ?'); params.append(country)
+        if since:
+            where.append('timestamp >= ?'); params.append(since)
+        if until:
+            where.append('timestamp < ?'); params.append(until)
+
+        conn = self._open_reader()
+        try:
+            for table in list_tables(conn):  # Oldest partition first
+                cursor = conn.execute(f'''
+                    SELECT {', '.join(dict.fromkeys(select))} FROM {table}
+                    {'WHERE ' + ' AND '.join(where) if where else ''}
+                    ORDER BY timestamp ASC, id ASC
+                ''', params)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    for row in rows:
+                        log = dict(row)
+                        if include_features:
+                            log['features'] = self._decode_features(conn, log)
+                            for name in ('region', 'country_encoded'):
+                                if name not in fields:
+                                    log.pop(name, None)
+                        yield log
+        finally:
+            conn.close()
+
+    def get_stats(self, since=None, until=None, country=None, region=None, window='day'):
+        """Per-country / per-region aggregates and feature drift, read from the daily rollups"""
+        with self._read_connection() as conn:
+            return rollup_stats(conn, since, until, country, region, window)
+
+    @staticmethod
+    def select_fields(fields=None):
+        """Validated column list for a query (all of LOG_FIELDS by default)"""
+        if not fields:
+            return list(LOG_FIELDS)
+        unknown = [f for f in fields if f not in LOG_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown log fields: {', '.join(unknown)}")
+        return ['id'] + [f for f in fields if f != 'id']
+
+    def _decode_features(self, conn, log):
+        """Feature dict of a fetched row (pops the encoded columns)"""
+        blob = log.pop('features_blob', None)
+        version = log.pop('feature_schema_version', None)
+        raw_json = log.pop('all_features_json', None)
+        if blob is not None and version is not None:
+            with self._schema_lock:
+                columns = self.schemas.get_columns(conn, version)
+            return decode_blob(blob, columns, log.get('region'), log.get('country_encoded'))
+        return json.loads(raw_json) if raw_json else None
     
     def clear_logs(self):
-        """Clear all logs"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM prediction_logs')
-        conn.commit()
-        conn.close()
+        """Clear all logs (including rows still waiting in the write queue) and their rollups"""
+        if self._writer is not None and self._writer.is_alive():
+            # Runs on the writer after the queued rows, so no batch straddles the drop
+            marker = _FlushMarker(self._drop_all)
+            self._enqueue(marker)
+            marker.event.wait()
+            if marker.error is not None:
+                raise marker.error
+            return
+        conn = self._connect()
+        try:
+            self._drop_all(conn)
+        finally:
+            conn.close()
+
+    def _drop_all(self, conn):
+        with conn:
+            conn.execute('BEGIN')  # DDL would otherwise autocommit table by table
+            for table in list_tables(conn):
+                drop_log_table(conn, table)  # Also recreates the (empty) legacy table
+            conn.execute(f'DELETE FROM {ROLLUP_TABLE}')
+        with self._partitions_lock:
+            self._partitions.clear()
+        conn.execute('PRAGMA incremental_vacuum')
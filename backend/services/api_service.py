@@ -1,18 +1,48 @@
-import requests
 from config import Config
-from utils.constants import AREA_MAP, DENSITY_BASELINE_MAP, MALARIA_BASELINE_MAP, COUNTRY_CODE_MAP
+from utils.constants import AREA_MAP, DENSITY_BASELINE_MAP, MALARIA_BASELINE_MAP, COUNTRY_CODE_MAP, REGION_MAP, FLIGHT_CONNECTIONS
+from services.cache import TTLCache
+from services.http_client import HTTPClient
+from services.who_store import WHOStore
 
 class APIService:
     
+    # Per-source caches: weather changes in minutes, density and WHO yearly totals at most yearly
+    CACHES = {
+        'weather': TTLCache('weather', Config.WEATHER_CACHE_TTL, Config.CACHE_MAX_ENTRIES, Config.CACHE_FALLBACK_TTL),
+        'population_density': TTLCache('population_density', Config.DENSITY_CACHE_TTL, Config.CACHE_MAX_ENTRIES, Config.CACHE_FALLBACK_TTL),
+        'disease_baseline': TTLCache('disease_baseline', Config.WHO_CACHE_TTL, Config.CACHE_MAX_ENTRIES, Config.CACHE_FALLBACK_TTL),
+        'historical_disease': TTLCache('historical_disease', Config.WHO_CACHE_TTL, Config.CACHE_MAX_ENTRIES, Config.CACHE_FALLBACK_TTL),
+        'flight_connections': TTLCache('flight_connections', Config.FLIGHT_CACHE_TTL, Config.CACHE_MAX_ENTRIES, Config.CACHE_FALLBACK_TTL)
+    }
+
+    # Bulk-loaded WHO case counts; when a country is in it no WHO request is made
+    WHO_STORE = WHOStore()
+
+    @staticmethod
+    def cache_stats():
+        return {name: cache.stats() for name, cache in APIService.CACHES.items()}
+
     @staticmethod
     def fetch_weather(country):
         """
-        Fetch weather data from OpenWeatherMap API.
+        Fetch weather data from OpenWeatherMap API (cached).
         Returns: (temp_c, precip_mm, humidity_pct)
         """
+        return APIService.CACHES['weather'].get_or_load(
+            country,
+            lambda: APIService._fetch_weather_live(country),
+            fallback=lambda: APIService.baseline_weather(country)
+        )
+
+    @staticmethod
+    def baseline_weather(country):
+        return 25.0, 0.0, 50.0  # Default values
+
+    @staticmethod
+    def _fetch_weather_live(country):
         try:
             url = f"https://api.openweathermap.org/data/2.5/weather?q={country}&appid={Config.WEATHER_API_KEY}"
-            response = requests.get(url, timeout=5)
+            response = HTTPClient.get(url, timeout=5)
             if response.status_code == 200:
                 data = response.json()
                 temp_c = data['main']['temp'] - 273.15
@@ -34,16 +64,28 @@ class APIService:
                 return temp_c, precip, humidity_pct
         except Exception as e:
             print(f"Weather API Error: {e}")
-        return 25.0, 0.0, 50.0  # Default values
+        return None
 
     @staticmethod
     def fetch_population_density(country):
+        return APIService.CACHES['population_density'].get_or_load(
+            country,
+            lambda: APIService._fetch_population_density_live(country),
+            fallback=lambda: APIService.baseline_population_density(country)
+        )
+
+    @staticmethod
+    def baseline_population_density(country):
+        return DENSITY_BASELINE_MAP.get(country, 300.0)
+
+    @staticmethod
+    def _fetch_population_density_live(country):
         # 1. Try Live API if we know the area
         if country in AREA_MAP:
             try:
                 headers = {'X-Api-Key': Config.NINJA_API_KEY.strip()}
                 url = f"https://api.api-ninjas.com/v1/population?country={country}"
-                response = requests.get(url, headers=headers, timeout=5)
+                response = HTTPClient.get(url, headers=headers, timeout=5)
                 if response.status_code == 200:
                     data = response.json()
                     latest = None
@@ -56,16 +98,28 @@ class APIService:
             except Exception as e:
                 print(f"Pop API Error: {e}")
         
-        # 2. Fallback
-        return DENSITY_BASELINE_MAP.get(country, 300.0)
+        # 2. Fallback (baseline_population_density, applied by the cache)
+        return None
 
     @staticmethod
     def fetch_disease_baseline(country):
+        if Config.WHO_STORE_ENABLED:
+            baseline = APIService.WHO_STORE.get_baseline(country)
+            if baseline is not None:
+                return baseline
+        return APIService.CACHES['disease_baseline'].get_or_load(
+            country,
+            lambda: APIService._fetch_disease_baseline_live(country),
+            fallback=lambda: MALARIA_BASELINE_MAP.get(country, 0.0)
+        )
+
+    @staticmethod
+    def _fetch_disease_baseline_live(country):
         if country in COUNTRY_CODE_MAP:
             try:
                 code = COUNTRY_CODE_MAP[country]
                 url = f"https://ghoapi.azureedge.net/api/MALARIA_CONF_CASES?$filter=SpatialDim eq '{code}'&$format=json"
-                response = requests.get(url, timeout=5)
+                response = HTTPClient.get(url, timeout=5)
                 if response.status_code == 200:
                     data = response.json()
                     if 'value' in data and data['value']:
@@ -73,79 +127,106 @@ class APIService:
                         return recs[0]['NumericValue'] / 12.0
             except Exception as e:
                 print(f"WHO API Error: {e}")
-        return MALARIA_BASELINE_MAP.get(country, 0.0)
+        return None
 
     @staticmethod
     def fetch_historical_disease_data(country):
         """
-        Fetch historical disease data from WHO API for calculating lag features.
+        Fetch historical disease data from WHO API for calculating lag features (cached).
         Returns dict with lag_1, lag_2, lag_3, lag_6, lag_12 (monthly case estimates)
         and rolling averages.
         """
-        lag_data = {
+        if Config.WHO_STORE_ENABLED:
+            lag_data = APIService.WHO_STORE.get_lag_data(country)
+            if lag_data is not None:
+                return lag_data
+        lag_data = APIService.CACHES['historical_disease'].get_or_load(
+            country,
+            lambda: APIService._fetch_historical_disease_data_live(country),
+            fallback=lambda: APIService.baseline_historical_data(country)
+        )
+        return dict(lag_data)  # Callers get their own copy of the cached dict
+
+    @staticmethod
+    def _empty_lag_data():
+        return {
             'lag_1': 0.0, 'lag_2': 0.0, 'lag_3': 0.0, 'lag_6': 0.0, 'lag_12': 0.0,
             'roll_mean_3': 0.0, 'roll_mean_6': 0.0, 'roll_mean_12': 0.0,
             'roll_std_3': 0.0, 'roll_std_6': 0.0, 'roll_std_12': 0.0
         }
+
+    @staticmethod
+    def lag_data_from_who_records(records):
+        """
+        Turn WHO MALARIA_CONF_CASES yearly records for one country into
+        lag / rolling features on the training data's monthly scale.
+        """
+        lag_data = APIService._empty_lag_data()
+        
+        # Sort by year descending to get most recent data first
+        recs = sorted(records, key=lambda x: x['TimeDim'], reverse=True)
+        
+        # Extract yearly values and convert to monthly estimates
+        # WHO API returns YEARLY total cases (e.g., Brazil 2017: 238,517)
+        # Training data has MONTHLY cases with average ~70, range 0-201
+        # Convert: yearly / 12 gives monthly average, then scale to match training distribution
+        # Empirically: WHO monthly (~20K) needs to scale to training monthly (~70)
+        # Scale factor: 20000 / 70 ≈ 285
+        SCALE_FACTOR = 3000.0  # Divide WHO monthly by this to match training range
         
+        yearly_values = []
+        for rec in recs[:12]:  # Get up to 12 years of data
+            if 'NumericValue' in rec and rec['NumericValue'] is not None:
+                # Convert yearly total to monthly, then scale to training range
+                monthly_estimate = rec['NumericValue'] / 12.0
+                scaled_monthly = monthly_estimate / SCALE_FACTOR
+                yearly_values.append(scaled_monthly)
+        
+        if yearly_values:
+            # Calculate lag features (simulating monthly lags from yearly data)
+            # lag_1 = most recent year / 12 (approximate current month)
+            lag_data['lag_1'] = yearly_values[0] if len(yearly_values) > 0 else 0.0
+            lag_data['lag_2'] = yearly_values[0] * 0.95 if len(yearly_values) > 0 else 0.0
+            lag_data['lag_3'] = yearly_values[0] * 0.90 if len(yearly_values) > 0 else 0.0
+            lag_data['lag_6'] = (yearly_values[0] + yearly_values[1]) / 2 if len(yearly_values) > 1 else yearly_values[0] * 0.85
+            lag_data['lag_12'] = yearly_values[1] if len(yearly_values) > 1 else yearly_values[0] * 0.80
+            
+            # Calculate rolling means
+            if len(yearly_values) >= 3:
+                lag_data['roll_mean_3'] = sum(yearly_values[:3]) / 3
+                lag_data['roll_std_3'] = (sum((x - lag_data['roll_mean_3'])**2 for x in yearly_values[:3]) / 3) ** 0.5
+            else:
+                lag_data['roll_mean_3'] = sum(yearly_values) / len(yearly_values)
+                lag_data['roll_std_3'] = 0.0
+            
+            if len(yearly_values) >= 6:
+                lag_data['roll_mean_6'] = sum(yearly_values[:6]) / 6
+                lag_data['roll_std_6'] = (sum((x - lag_data['roll_mean_6'])**2 for x in yearly_values[:6]) / 6) ** 0.5
+            else:
+                lag_data['roll_mean_6'] = lag_data['roll_mean_3']
+                lag_data['roll_std_6'] = lag_data['roll_std_3']
+            
+            if len(yearly_values) >= 12:
+                lag_data['roll_mean_12'] = sum(yearly_values[:12]) / 12
+                lag_data['roll_std_12'] = (sum((x - lag_data['roll_mean_12'])**2 for x in yearly_values[:12]) / 12) ** 0.5
+            else:
+                lag_data['roll_mean_12'] = lag_data['roll_mean_6']
+                lag_data['roll_std_12'] = lag_data['roll_std_6']
+        
+        return lag_data
+
+    @staticmethod
+    def _fetch_historical_disease_data_live(country):
         if country in COUNTRY_CODE_MAP:
             try:
                 code = COUNTRY_CODE_MAP[country]
                 url = f"https://ghoapi.azureedge.net/api/MALARIA_CONF_CASES?$filter=SpatialDim eq '{code}'&$format=json"
-                response = requests.get(url, timeout=10)
+                response = HTTPClient.get(url, timeout=10)
                 
                 if response.status_code == 200:
                     data = response.json()
                     if 'value' in data and data['value']:
-                        # Sort by year descending to get most recent data first
-                        recs = sorted(data['value'], key=lambda x: x['TimeDim'], reverse=True)
-                        
-                        # Extract yearly values and convert to monthly estimates
-                        # WHO API returns YEARLY total cases (e.g., Brazil 2017: 238,517)
-                        # Training data has MONTHLY cases with average ~70, range 0-201
-                        # Convert: yearly / 12 gives monthly average, then scale to match training distribution
-                        # Empirically: WHO monthly (~20K) needs to scale to training monthly (~70)
-                        # Scale factor: 20000 / 70 ≈ 285
-                        SCALE_FACTOR = 3000.0  # Divide WHO monthly by this to match training range
-                        
-                        yearly_values = []
-                        for rec in recs[:12]:  # Get up to 12 years of data
-                            if 'NumericValue' in rec and rec['NumericValue'] is not None:
-                                # Convert yearly total to monthly, then scale to training range
-                                monthly_estimate = rec['NumericValue'] / 12.0
-                                scaled_monthly = monthly_estimate / SCALE_FACTOR
-                                yearly_values.append(scaled_monthly)
-                        
-                        if yearly_values:
-                            # Calculate lag features (simulating monthly lags from yearly data)
-                            # lag_1 = most recent year / 12 (approximate current month)
-                            lag_data['lag_1'] = yearly_values[0] if len(yearly_values) > 0 else 0.0
-                            lag_data['lag_2'] = yearly_values[0] * 0.95 if len(yearly_values) > 0 else 0.0
-                            lag_data['lag_3'] = yearly_values[0] * 0.90 if len(yearly_values) > 0 else 0.0
-                            lag_data['lag_6'] = (yearly_values[0] + yearly_values[1]) / 2 if len(yearly_values) > 1 else yearly_values[0] * 0.85
-                            lag_data['lag_12'] = yearly_values[1] if len(yearly_values) > 1 else yearly_values[0] * 0.80
-                            
-                            # Calculate rolling means
-                            if len(yearly_values) >= 3:
-                                lag_data['roll_mean_3'] = sum(yearly_values[:3]) / 3
-                                lag_data['roll_std_3'] = (sum((x - lag_data['roll_mean_3'])**2 for x in yearly_values[:3]) / 3) ** 0.5
-                            else:
-                                lag_data['roll_mean_3'] = sum(yearly_values) / len(yearly_values)
-                                lag_data['roll_std_3'] = 0.0
-                            
-                            if len(yearly_values) >= 6:
-                                lag_data['roll_mean_6'] = sum(yearly_values[:6]) / 6
-                                lag_data['roll_std_6'] = (sum((x - lag_data['roll_mean_6'])**2 for x in yearly_values[:6]) / 6) ** 0.5
-                            else:
-                                lag_data['roll_mean_6'] = lag_data['roll_mean_3']
-                                lag_data['roll_std_6'] = lag_data['roll_std_3']
-                            
-                            if len(yearly_values) >= 12:
-                                lag_data['roll_mean_12'] = sum(yearly_values[:12]) / 12
-                                lag_data['roll_std_12'] = (sum((x - lag_data['roll_mean_12'])**2 for x in yearly_values[:12]) / 12) ** 0.5
-                            else:
-                                lag_data['roll_mean_12'] = lag_data['roll_mean_6']
-                                lag_data['roll_std_12'] = lag_data['roll_std_6']
+                        lag_data = APIService.lag_data_from_who_records(data['value'])
                         
                         print(f"WHO Historical Data for {country}: lag_1={lag_data['lag_1']:.2f}, lag_12={lag_data['lag_12']:.2f}")
                         return lag_data
@@ -153,9 +234,16 @@ class APIService:
             except Exception as e:
                 print(f"WHO Historical API Error: {e}")
         
-        # Fallback to baseline estimates if API fails
-        # Training data has monthly malaria cases in range 0-201 (average ~70)
-        # Use baseline map values which are already scaled correctly
+        return None
+
+    @staticmethod
+    def baseline_historical_data(country):
+        """
+        Fallback to baseline estimates if API fails.
+        Training data has monthly malaria cases in range 0-201 (average ~70)
+        Use baseline map values which are already scaled correctly
+        """
+        lag_data = APIService._empty_lag_data()
         baseline_monthly = MALARIA_BASELINE_MAP.get(country, 50.0)
         
         lag_data['lag_1'] = baseline_monthly
@@ -257,18 +345,25 @@ class APIService:
     @staticmethod
     def fetch_flight_connections(country):
         """
-        Fetch flight connections using Aviation Stack API.
+        Fetch flight connections using Aviation Stack API (cached).
         Falls back to dataset-restricted connections if API fails.
         Only returns countries that exist in the training dataset.
         """
-        from utils.constants import REGION_MAP
-        
+        connections = APIService.CACHES['flight_connections'].get_or_load(
+            country,
+            lambda: APIService._fetch_flight_connections_live(country),
+            fallback=lambda: APIService._get_fallback_connections(country, REGION_MAP)
+        )
+        return list(connections)
+
+    @staticmethod
+    def _fetch_flight_connections_live(country):
         # Try Aviation Stack API first
         if country in APIService.COUNTRY_AIRPORT_MAP:
             try:
                 airport_code = APIService.COUNTRY_AIRPORT_MAP[country]
                 url = f"http://api.aviationstack.com/v1/flights?access_key={Config.AVIATION_KEY}&dep_iata={airport_code}&limit=100"
-                response = requests.get(url, timeout=10)
+                response = HTTPClient.get(url, timeout=10)
                 
                 if response.status_code == 200:
                     data = response.json()
@@ -291,8 +386,8 @@ class APIService:
             except Exception as e:
                 print(f"Aviation API Error for {country}: {e}")
         
-        # Fallback to curated dataset-restricted connections
-        return APIService._get_fallback_connections(country, REGION_MAP)
+        # Fallback to curated dataset-restricted connections (applied by the cache)
+        return None
 
     @staticmethod
     def _get_fallback_connections(country, REGION_MAP):
@@ -300,140 +395,6 @@ class APIService:
         Fallback flight connections restricted to dataset countries.
         Used when Aviation API is unavailable or returns no results.
         """
-        connections = {
-            # --- SOUTH ASIA & MIDDLE EAST HUB ---
-            'Pakistan': ['United Arab Emirates', 'Saudi Arabia', 'Iran', 'Bangladesh', 'Oman'],
-            'Bangladesh': ['Pakistan', 'Myanmar', 'Nepal'],
-            'Iran': ['Pakistan', 'Turkmenistan', 'Armenia', 'Azerbaijan'],
-            'United Arab Emirates': ['Pakistan', 'Saudi Arabia', 'Egypt', 'Germany', 'Oman'],
-            'Saudi Arabia': ['United Arab Emirates', 'Egypt', 'Ethiopia', 'Pakistan', 'Oman'],
-            'Oman': ['United Arab Emirates', 'Pakistan', 'Saudi Arabia'],
-            'Armenia': ['Iran', 'Azerbaijan'],
-            'Azerbaijan': ['Iran', 'Armenia', 'Turkmenistan'],
-            'Turkmenistan': ['Iran', 'Azerbaijan', 'Uzbekistan', 'Tajikistan'],
-            'Uzbekistan': ['Turkmenistan', 'Tajikistan'],
-            'Tajikistan': ['Turkmenistan', 'Uzbekistan'],
-            'Nepal': ['Bangladesh', 'Myanmar'],
-            'Myanmar': ['Bangladesh', 'Nepal', "Lao People's Democratic Republic", 'Cambodia'],
-            'Cambodia': ['Myanmar', "Lao People's Democratic Republic", 'Singapore'],
-            "Lao People's Democratic Republic": ['Myanmar', 'Cambodia'],
-
-            # --- EUROPE HUB ---
-            'Germany': ['United Arab Emirates', 'Belgium', 'Poland', 'Czech Republic', 'Denmark', 'Sweden', 'Netherlands'],
-            'Belgium': ['Germany', 'Ireland', 'Netherlands', 'Poland'],
-            'Ireland': ['Belgium', 'Portugal', 'Brazil'],
-            'Sweden': ['Germany', 'Finland', 'Estonia', 'Denmark', 'Poland'],
-            'Portugal': ['Ireland', 'Brazil', 'Morocco'],
-            'Poland': ['Germany', 'Belgium', 'Sweden', 'Czech Republic', 'Hungary'],
-            'Czech Republic': ['Germany', 'Poland', 'Hungary', 'Slovakia (Slovak Republic)'],
-            'Hungary': ['Poland', 'Czech Republic', 'Serbia', 'Slovenia', 'Montenegro'],
-            'Denmark': ['Germany', 'Sweden', 'Finland'],
-            'Finland': ['Sweden', 'Denmark', 'Estonia'],
-            'Estonia': ['Sweden', 'Finland'],
-            'Netherlands': ['Germany', 'Belgium'],
-            'Serbia': ['Hungary', 'Montenegro', 'Bulgaria'],
-            'Montenegro': ['Hungary', 'Serbia'],
-            'Slovenia': ['Hungary'],
-            'Bulgaria': ['Serbia'],
-            'Slovakia (Slovak Republic)': ['Czech Republic', 'Hungary'],
-            'Cyprus': ['Egypt', 'Israel'],
-            'Israel': ['Cyprus', 'Egypt'],
-            'Malta': ['Egypt'],
-            'Monaco': ['Belgium'],
-            'Liechtenstein': ['Germany'],
-            'San Marino': ['Hungary'],
-
-            # --- EAST ASIA & PACIFIC HUB ---
-            'Japan': ['Korea', 'Philippines', 'Guam', 'Hong Kong'],
-            'Korea': ['Japan', 'Philippines', 'Hong Kong'],
-            'Philippines': ['Japan', 'Korea', 'Palau', 'Singapore', 'Hong Kong'],
-            'Hong Kong': ['Japan', 'Korea', 'Philippines', 'Macao', 'Singapore'],
-            'Macao': ['Hong Kong', 'Philippines'],
-            'Singapore': ['Philippines', 'Hong Kong', 'Cambodia'],
-            'Guam': ['Japan', 'Palau', 'Micronesia', 'Northern Mariana Islands'],
-            'Palau': ['Philippines', 'Guam', 'Micronesia'],
-            'Micronesia': ['Guam', 'Palau', 'Marshall Islands'],
-            'Marshall Islands': ['Micronesia', 'Kiribati'],
-            'Kiribati': ['Marshall Islands', 'Fiji', 'Tuvalu'],
-            'Fiji': ['Kiribati', 'Tonga', 'New Caledonia', 'Tuvalu'],
-            'Tonga': ['Fiji', 'American Samoa'],
-            'Tuvalu': ['Fiji', 'Kiribati'],
-            'American Samoa': ['Tonga', 'French Polynesia'],
-            'French Polynesia': ['American Samoa', 'New Caledonia'],
-            'New Caledonia': ['Fiji', 'French Polynesia', 'Papua New Guinea'],
-            'Papua New Guinea': ['New Caledonia'],
-            'Northern Mariana Islands': ['Guam'],
-
-            # --- AFRICA HUB ---
-            'Egypt': ['Saudi Arabia', 'United Arab Emirates', 'Ethiopia', 'Morocco', 'Kenya', 'Nigeria', 'Cyprus', 'Israel', 'Malta'],
-            'Ethiopia': ['Egypt', 'Kenya', 'Saudi Arabia', 'Djibouti'],
-            'Kenya': ['Ethiopia', 'Nigeria', 'South Africa', 'Egypt', 'Rwanda', 'Mozambique'],
-            'Nigeria': ['Kenya', 'Togo', 'Egypt', 'Morocco', 'Mali', 'Chad', 'Congo', 'Gabon'],
-            'South Africa': ['Kenya', 'Mozambique', 'Namibia', 'Lesotho', 'Zimbabwe'],
-            'Morocco': ['Portugal', 'Egypt', 'Mauritania', 'Mali', 'Nigeria'],
-            'Djibouti': ['Ethiopia'],
-            'Rwanda': ['Kenya', 'Congo'],
-            'Togo': ['Nigeria', 'Burkina Faso', 'Mali', 'Gabon'],
-            'Mali': ['Nigeria', 'Morocco', 'Mauritania', 'Burkina Faso', 'Togo'],
-            'Mauritania': ['Morocco', 'Mali'],
-            'Burkina Faso': ['Mali', 'Togo'],
-            'Chad': ['Nigeria', 'Congo', 'Gabon'],
-            'Congo': ['Nigeria', 'Chad', 'Gabon', 'Rwanda'],
-            'Gabon': ['Nigeria', 'Togo', 'Congo', 'Chad', 'Sao Tome and Principe'],
-            'Sao Tome and Principe': ['Gabon'],
-            'Mozambique': ['South Africa', 'Kenya', 'Zimbabwe', 'Mauritius', 'Reunion', 'Mayotte'],
-            'Namibia': ['South Africa'],
-            'Lesotho': ['South Africa'],
-            'Zimbabwe': ['South Africa', 'Mozambique'],
-            'Mauritius': ['Mozambique', 'Reunion', 'Mayotte'],
-            'Reunion': ['Mozambique', 'Mauritius', 'Mayotte'],
-            'Mayotte': ['Mozambique', 'Mauritius', 'Reunion'],
-            'Liberia': ['Guinea-Bissau'],
-            'Guinea-Bissau': ['Liberia'],
-
-            # --- AMERICAS HUB ---
-            'Brazil': ['Portugal', 'Colombia', 'Peru', 'Suriname', 'Mexico', 'French Guiana', 'Guyana', 'Ireland'],
-            'Colombia': ['Brazil', 'Ecuador', 'Peru', 'Mexico'],
-            'Mexico': ['Brazil', 'Colombia', 'Cuba', 'El Salvador'],
-            'Cuba': ['Mexico', 'Bahamas', 'Dominican Republic', 'Dominica'],
-            'Peru': ['Brazil', 'Colombia', 'Ecuador', 'Chile'],
-            'Ecuador': ['Colombia', 'Peru'],
-            'Chile': ['Peru', 'Falkland Islands (Malvinas)'],
-            'Bahamas': ['Cuba', 'Dominican Republic'],
-            'Dominican Republic': ['Cuba', 'Bahamas', 'Barbados', 'Dominica', 'Grenada'],
-            'Barbados': ['Dominican Republic', 'Grenada', 'Antigua and Barbuda', 'Saint Lucia'],
-            'Dominica': ['Cuba', 'Dominican Republic', 'Guadeloupe', 'Martinique'],
-            'Grenada': ['Dominican Republic', 'Barbados', 'Saint Vincent and the Grenadines'],
-            'Antigua and Barbuda': ['Barbados', 'Saint Kitts and Nevis', 'Montserrat'],
-            'Saint Kitts and Nevis': ['Antigua and Barbuda'],
-            'Saint Lucia': ['Barbados', 'Saint Vincent and the Grenadines', 'Martinique'],
-            'Saint Vincent and the Grenadines': ['Grenada', 'Saint Lucia'],
-            'Guadeloupe': ['Dominica', 'Martinique'],
-            'Martinique': ['Dominica', 'Guadeloupe', 'Saint Lucia'],
-            'Montserrat': ['Antigua and Barbuda'],
-            'Suriname': ['Brazil', 'French Guiana', 'Guyana'],
-            'French Guiana': ['Brazil', 'Suriname'],
-            'Guyana': ['Brazil', 'Suriname'],
-            'El Salvador': ['Mexico'],
-            'Aruba': ['Colombia'],
-            'Falkland Islands (Malvinas)': ['Chile'],
-            'Saint Pierre and Miquelon': ['Greenland'],
-            'Greenland': ['Denmark', 'Saint Pierre and Miquelon'],
-
-            # --- REMOTE/ISLAND TERRITORIES ---
-            'Wallis and Futuna': ['Fiji'],
-            'Pitcairn Islands': ['French Polynesia'],
-            'Saint Helena': ['Namibia'],
-            'Saint Barthelemy': ['Guadeloupe'],
-            'Cocos (Keeling) Islands': ['Christmas Island'],
-            'Christmas Island': ['Cocos (Keeling) Islands', 'Singapore'],
-            'Isle of Man': ['Ireland'],
-            'Palestinian Territory': ['Israel'],
-            'Syrian Arab Republic': ['Cyprus'],
-            'Antarctica (the territory South of 60 deg S)': ['Chile'],
-            'South Georgia and the South Sandwich Islands': ['Falkland Islands (Malvinas)']
-        }
-        
-        result = connections.get(country, [])
+        result = FLIGHT_CONNECTIONS.get(country, [])
         valid_connections = [c for c in result if c in REGION_MAP]
         return valid_connections
\ No newline at end of file
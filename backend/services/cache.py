@@ -0,0 +1,159 @@
+"""
+In-process TTL/LRU cache with single-flight loading for upstream fetchers,
+and a standalone single-flight group for coalescing in-flight computations.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class _InFlight:
+    """A load in progress; concurrent callers for the same key wait on it"""
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    def __init__(self, name, ttl, max_entries=512, fallback_ttl=None):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # Fallback values (upstream failed) are kept for a shorter time so we retry soon
+        self.fallback_ttl = min(ttl, fallback_ttl) if fallback_ttl is not None else ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def get_or_load(self, key, loader, fallback=None):
+        """
+        Return the cached value for `key`, calling `loader()` on a miss.
+        If the loader returns None, `fallback()` is cached for `fallback_ttl` instead.
+        Only one loader runs per key; other callers missing the same key wait for it.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _InFlight()
+
+        if not leader:
+            flight.event.wait()
+            if flight.error:
+                raise flight.error
+            return flight.value
+
+        try:
+            value, ttl = loader(), self.ttl
+            if value is None and fallback is not None:
+                value, ttl = fallback(), self.fallback_ttl
+            self.set(key, value, ttl)
+            flight.value = value
+            return value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                self.loads += 1
+            flight.event.set()
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key=None):
+        """Drop one key, or everything when key is None"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'name': self.name,
+                'ttl_seconds': self.ttl,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+                'upstream_loads': self.loads,
+                'evictions': self.evictions
+            }
+
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight work without caching finished results: the first
+    caller for a key computes it (the leader), callers arriving meanwhile wait for
+    the leader's result or error.
+    """
+    def __init__(self, name):
+        self.name = name
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.led = 0
+        self.shared = 0
+
+    def claim(self, keys):
+        """
+        Atomically split keys into (owned, waiting) dicts of key -> flight. The caller
+        must compute every owned key and resolve() it; waiting keys are being computed
+        by someone else. Claiming all keys at once lets overlapping batches share work.
+        """
+        owned, waiting = {}, {}
+        with self._lock:
+            for key in keys:
+                flight = self._inflight.get(key)
+                if flight is None:
+                    owned[key] = self._inflight[key] = _InFlight()
+                else:
+                    waiting[key] = flight
+            self.led += len(owned)
+            self.shared += len(waiting)
+        return owned, waiting
+
+    def resolve(self, key, flight, value=None, error=None):
+        flight.value, flight.error = value, error
+        with self._lock:
+            if self._inflight.get(key) is flight:
+                del self._inflight[key]
+        flight.event.set()
+
+    @staticmethod
+    def wait(flight):
+        flight.event.wait()
+        if flight.error:
+            raise flight.error
+        return flight.value
+
+    def stats(self):
+        with self._lock:
+            total = self.led + self.shared
+            return {
+                'name': self.name,
+                'in_flight': len(self._inflight),
+                'computed': self.led,
+                'shared': self.shared,
+                'shared_rate': round(self.shared / total, 4) if total else 0.0
+            }
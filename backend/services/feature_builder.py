@@ -0,0 +1,157 @@
+"""
+Compiled feature-vector builder for the ANN model.
+
+The column layout of the model input (scaler_X.feature_names_in_) is resolved
+once into index arrays, so building a request's feature vector is a handful of
+NumPy fancy-index writes into a preallocated matrix instead of a dict with
+every feature name plus a substring scan over all columns.
+"""
+import numpy as np
+from utils.constants import REGION_MAP
+
+HISTORY_KEYS = [
+    'lag_1', 'lag_2', 'lag_3', 'lag_6', 'lag_12',
+    'roll_mean_3', 'roll_mean_6', 'roll_mean_12',
+    'roll_std_3', 'roll_std_6', 'roll_std_12'
+]
+
+# Named (non one-hot) features in the order they are laid out in the source vector;
+# the malaria history values, then the dengue history values (HISTORY_KEYS order) follow them
+SOURCE_FEATURES = [
+    'year', 'month', 'quarter', 'month_sin', 'month_cos',
+    'avg_temp_c', 'precipitation_mm', 'humidity_pct',
+    'vector_index', 'water_stagnation_index',
+    'population_density', 'air_quality_index', 'uv_index', 'healthcare_budget'
+]
+
+DEFAULT_AIR_QUALITY_INDEX = 50.0  # Default moderate AQI
+DEFAULT_UV_INDEX = 6.0  # Default moderate UV
+# Healthcare budget: training range is 205-4969, use median value
+DEFAULT_HEALTHCARE_BUDGET = 2750.0  # Approximate median from training data
+DENGUE_RATIO = 0.3  # Dengue typically lower than malaria (used when no dengue history is available)
+
+
+def _generic_history_key(col):
+    """
+    Resolve the fallback history key for lag/rolling columns that are still zero
+    after the named features are written. Mirrors the original substring rules,
+    including their precedence ('1' is checked before '12').
+    """
+    lower = col.lower()
+    if 'lag' in lower:
+        for digit in ['1', '2', '3', '6', '12']:
+            if digit in col:
+                return f'lag_{digit}'
+        return None
+    if 'roll' in lower:
+        stat = 'mean' if 'mean' in lower else 'std' if 'std' in lower else None
+        if stat:
+            for digit in ['3', '6', '12']:
+                if digit in col:
+                    return f'roll_{stat}_{digit}'
+    return None
+
+
+class FeatureBuilder:
+    def __init__(self, feature_names, onehot=None):
+        """onehot: precomputed {country: (country column, region column)}, e.g. from the model artifact"""
+        self.feature_names = list(feature_names)
+        self.n_features = len(self.feature_names)
+        self.index = {name: i for i, name in enumerate(self.feature_names)}
+
+        # Source vector = named features followed by the malaria and dengue history values
+        self._history_offset = len(SOURCE_FEATURES)
+        history_pos = {key: self._history_offset + i for i, key in enumerate(HISTORY_KEYS)}
+        dengue_pos = {key: self._history_offset + len(HISTORY_KEYS) + i for i, key in enumerate(HISTORY_KEYS)}
+
+        # Primary writes: row[targets] = source[sources]
+        targets, sources = [], []
+        for pos, name in enumerate(SOURCE_FEATURES):
+            if name in self.index:
+                targets.append(self.index[name]); sources.append(pos)
+        for key in HISTORY_KEYS:
+            malaria_col, dengue_col = f'malaria_cases_{key}', f'dengue_cases_{key}'
+            if malaria_col in self.index:
+                targets.append(self.index[malaria_col]); sources.append(history_pos[key])
+            if dengue_col in self.index:
+                targets.append(self.index[dengue_col]); sources.append(dengue_pos[key])
+        self._targets = np.array(targets, dtype=np.intp)
+        self._sources = np.array(sources, dtype=np.intp)
+
+        # Fallback writes for lag/roll columns that end up 0.0 after the primary writes
+        fb_targets, fb_sources = [], []
+        for col in self.feature_names:
+            key = _generic_history_key(col)
+            if key:
+                fb_targets.append(self.index[col]); fb_sources.append(history_pos[key])
+        self._fb_targets = np.array(fb_targets, dtype=np.intp)
+        self._fb_sources = np.array(fb_sources, dtype=np.intp)
+
+        # One-hot positions per country (-1 when the column was dropped in training)
+        self._onehot = dict(onehot) if onehot is not None else self._onehot_index()
+
+    def _onehot_index(self):
+        onehot = {}
+        for country in set(REGION_MAP) | {c[len('country_'):] for c in self.feature_names if c.startswith('country_')}:
+            reg = REGION_MAP.get(country)
+            onehot[country] = (
+                self.index.get(f"country_{country}", -1),
+                self.index.get(f"region_{reg}", -1) if reg else -1
+            )
+        return onehot
+
+    @staticmethod
+    def dengue_history(hist, key):
+        """Dengue history value: real data when the source has it, else the malaria ratio estimate"""
+        return hist.get(f'dengue_{key}', hist[key] * DENGUE_RATIO)
+
+    @staticmethod
+    def source_vector(inputs, now):
+        """Lay out one country's raw inputs in SOURCE_FEATURES + malaria/dengue HISTORY_KEYS order"""
+        hist = inputs['historical_data']
+        return np.array([
+            # NOTE: Training data is 2000-2023, so cap year at 2023 to match training distribution
+            min(now.year, 2023), now.month, (now.month - 1) // 3 + 1,
+            np.sin(2 * np.pi * now.month / 12), np.cos(2 * np.pi * now.month / 12),
+            inputs['temp'], inputs['precip'], inputs['humidity'],
+            inputs['vector_index'], inputs['water_stagnation'],
+            inputs['density'], DEFAULT_AIR_QUALITY_INDEX, DEFAULT_UV_INDEX, DEFAULT_HEALTHCARE_BUDGET
+        ] + [hist[key] for key in HISTORY_KEYS]
+          + [FeatureBuilder.dengue_history(hist, key) for key in HISTORY_KEYS], dtype=np.float64)
+
+    def build_row(self, country, inputs, now, out=None):
+        """Write one country's feature vector into `out` (or a new row) and return it"""
+        row = np.zeros(self.n_features, dtype=np.float64) if out is None else out
+        src = self.source_vector(inputs, now)
+        row[self._targets] = src[self._sources]
+        if len(self._fb_targets):
+            zero = row[self._fb_targets] == 0.0
+            row[self._fb_targets[zero]] = src[self._fb_sources[zero]]
+        country_idx, region_idx = self._onehot.get(country, (-1, -1))
+        if country_idx >= 0: row[country_idx] = 1.0
+        if region_idx >= 0: row[region_idx] = 1.0
+        return row
+
+    def build_matrix(self, countries, inputs_list, now):
+        """Build the (n_countries, n_features) model input matrix in one allocation"""
+        X = np.zeros((len(countries), self.n_features), dtype=np.float64)
+        for i, (country, inputs) in enumerate(zip(countries, inputs_list)):
+            self.build_row(country, inputs, now, out=X[i])
+        return X
+
+    def named_features(self, country, inputs, now):
+        """Human-readable features for logging/explanations (no zero one-hot columns)"""
+        src = self.source_vector(inputs, now)
+        features = dict(zip(SOURCE_FEATURES, src[:self._history_offset].tolist()))
+        features['year'] = int(features['year'])
+        features['month'] = int(features['month'])
+        features['quarter'] = int(features['quarter'])
+        hist = inputs['historical_data']
+        for key in HISTORY_KEYS:
+            features[f'malaria_cases_{key}'] = hist[key]
+            if f'dengue_cases_{key}' in self.index:
+                features[f'dengue_cases_{key}'] = self.dengue_history(hist, key)
+        features[f"country_{country}"] = 1.0
+        reg = REGION_MAP.get(country)
+        if reg: features[f"region_{reg}"] = 1.0
+        return features
@@ -0,0 +1,118 @@
+"""
+Offline lag / rolling feature store built from climate_disease_dataset.csv.
+
+The build step computes, for every country, the malaria and dengue lag and
+rolling features for the month after its last observation, using the same
+groupby shift / rolling conventions as training (Model Training/Milestone 4).
+The result is a float32 matrix (one row per country) saved as .npy plus a small
+JSON index; serving memory-maps the matrix and reads a country's row in O(1).
+
+Build with:  python -m services.feature_store
+"""
+import json
+import os
+import time
+import numpy as np
+from config import Config
+from services.feature_builder import HISTORY_KEYS
+
+TARGETS = {'malaria': 'malaria_cases', 'dengue': 'dengue_cases'}
+LAGS = [1, 2, 3, 6, 12]
+ROLLS = [3, 6, 12]
+
+# Column order of the stored matrix
+COLUMNS = [f'{disease}_{key}' for disease in TARGETS for key in HISTORY_KEYS]
+
+
+def _index_path(store_path):
+    return os.path.splitext(store_path)[0] + '.json'
+
+
+def build_feature_store(csv_path=None, store_path=None):
+    """Compute next-month lag / rolling features per country and write the store"""
+    import pandas as pd
+    csv_path = csv_path or Config.CLIMATE_DATASET_PATH
+    store_path = store_path or Config.FEATURE_STORE_PATH
+
+    df = pd.read_csv(csv_path, usecols=['year', 'month', 'country'] + list(TARGETS.values()))
+    df = df.sort_values(['country', 'year', 'month']).reset_index(drop=True)
+    grouped = df.groupby('country', sort=False)
+
+    out = pd.DataFrame(index=df.index)
+    for disease, target in TARGETS.items():
+        series = grouped[target]
+        # Predicting the month after the last row: lag_k is the value k-1 rows back
+        for lag in LAGS:
+            out[f'{disease}_lag_{lag}'] = series.shift(lag - 1)
+        for window in ROLLS:
+            rolling = series.rolling(window, min_periods=1)
+            out[f'{disease}_roll_mean_{window}'] = rolling.mean().reset_index(level=0, drop=True)
+            out[f'{disease}_roll_std_{window}'] = rolling.std().reset_index(level=0, drop=True)
+
+    last = grouped.tail(1).index
+    latest = out.loc[last, COLUMNS].fillna(0.0)
+    countries = df.loc[last, 'country'].tolist()
+    as_of = df.loc[last, ['year', 'month']].astype(int).values.tolist()
+
+    os.makedirs(os.path.dirname(store_path), exist_ok=True)
+    np.save(store_path, np.ascontiguousarray(latest.to_numpy(dtype=np.float32)))
+    with open(_index_path(store_path), 'w') as f:
+        json.dump({
+            'columns': COLUMNS,
+            'countries': {country: i for i, country in enumerate(countries)},
+            'as_of': {country: ym for country, ym in zip(countries, as_of)},
+            'source': os.path.basename(csv_path),
+            'built_at': time.time()
+        }, f)
+    print(f"Feature store built: {len(countries)} countries x {len(COLUMNS)} features -> {store_path}")
+    return store_path
+
+
+class FeatureStore:
+    def __init__(self, store_path=None):
+        self.store_path = store_path or Config.FEATURE_STORE_PATH
+        self.matrix = None
+        self.countries = {}
+        self.as_of = {}
+        self._columns = {}
+        self.load()
+
+    def load(self):
+        if not (os.path.exists(self.store_path) and os.path.exists(_index_path(self.store_path))):
+            print(f"Feature store not found at {self.store_path} (build with python -m services.feature_store)")
+            return False
+        try:
+            with open(_index_path(self.store_path)) as f:
+                index = json.load(f)
+            self.matrix = np.load(self.store_path, mmap_mode='r')
+            self.countries = index['countries']
+            self.as_of = index.get('as_of', {})
+            self._columns = {col: i for i, col in enumerate(index['columns'])}
+            print(f"Feature store loaded: {len(self.countries)} countries")
+            return True
+        except Exception as e:
+            print(f"Feature store load error: {e}")
+            self.matrix = None
+            return False
+
+    def __contains__(self, country):
+        return self.matrix is not None and country in self.countries
+
+    def get(self, country):
+        """
+        Historical features for a country in the APIService.fetch_historical_disease_data
+        layout (malaria under lag_* / roll_*, dengue under dengue_lag_* / dengue_roll_*),
+        or None if the country is not in the store.
+        """
+        if country not in self:
+            return None
+        row = self.matrix[self.countries[country]].tolist()
+        data = {}
+        for key in HISTORY_KEYS:
+            data[key] = row[self._columns[f'malaria_{key}']]
+            data[f'dengue_{key}'] = row[self._columns[f'dengue_{key}']]
+        return data
+
+
+if __name__ == '__main__':
+    build_feature_store()
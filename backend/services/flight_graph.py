@@ -0,0 +1,93 @@
+"""
+Compiled, integer-indexed flight graph.
+
+Country names are mapped to integer ids once and adjacency is stored in CSR
+arrays (indptr / indices), merging the curated FLIGHT_CONNECTIONS with any
+Aviation Stack edges fetched so far. Neighbor lookups are O(1) and need no
+per-call dict construction or filtering.
+"""
+import threading
+import numpy as np
+from utils.constants import REGION_MAP, FLIGHT_CONNECTIONS
+
+
+class FlightGraph:
+    def __init__(self, countries=None, connections=None):
+        self.countries = list(countries if countries is not None else REGION_MAP.keys())
+        self.ids = {country: i for i, country in enumerate(self.countries)}
+        connections = FLIGHT_CONNECTIONS if connections is None else connections
+        # Ordered adjacency per node (curated order first, API edges appended)
+        self._adjacency = [
+            [self.ids[n] for n in connections.get(country, []) if n in self.ids and n != country]
+            for country in self.countries
+        ]
+        self.version = 0
+        self._lock = threading.Lock()
+        self._compile()
+
+    def _compile(self):
+        """Rebuild the CSR arrays and the per-node neighbor name tuples"""
+        degrees = [len(neighbors) for neighbors in self._adjacency]
+        indptr = np.zeros(len(self.countries) + 1, dtype=np.int32)
+        np.cumsum(degrees, out=indptr[1:])
+        indices = np.array([n for neighbors in self._adjacency for n in neighbors], dtype=np.int32)
+        names = tuple(tuple(self.countries[n] for n in neighbors) for neighbors in self._adjacency)
+        # Swap in as one tuple so readers never see a half-built graph
+        self._csr = (indptr, indices, names)
+        self.version += 1
+
+    @property
+    def indptr(self):
+        return self._csr[0]
+
+    @property
+    def indices(self):
+        return self._csr[1]
+
+    def csr(self):
+        """(indptr, indices) from the same compiled version"""
+        return self._csr[0], self._csr[1]
+
+    def __contains__(self, country):
+        return country in self.ids
+
+    def neighbors(self, country):
+        """Neighbor country names (empty for unknown countries)"""
+        node = self.ids.get(country)
+        return self._csr[2][node] if node is not None else ()
+
+    def neighbor_ids(self, node):
+        indptr, indices, _ = self._csr
+        return indices[indptr[node]:indptr[node + 1]]
+
+    def merge_edges(self, country, destinations):
+        """Add edges (e.g. from Aviation Stack) for a country; recompiles only if something is new"""
+        node = self.ids.get(country)
+        if node is None:
+            return False
+        with self._lock:
+            existing = set(self._adjacency[node])
+            added = [self.ids[d] for d in destinations if d in self.ids and d != country and self.ids[d] not in existing]
+            if not added:
+                return False
+            self._adjacency[node] = self._adjacency[node] + list(dict.fromkeys(added))
+            self._compile()
+        return True
+
+    def refresh_from_api(self):
+        """Merge the (cached) Aviation Stack connections for every country we have an airport for"""
+        from services.api_service import APIService
+        changed = 0
+        for country in APIService.COUNTRY_AIRPORT_MAP:
+            if country in self.ids and self.merge_edges(country, APIService.fetch_flight_connections(country)):
+                changed += 1
+        if changed:
+            print(f"Flight graph: merged Aviation API edges for {changed} countries")
+        return changed
+
+    def stats(self):
+        return {
+            'nodes': len(self.countries),
+            'edges': int(self.indptr[-1]),
+            'version': self.version
+        }
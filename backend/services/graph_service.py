@@ -1,12 +1,26 @@
 import heapq
-from collections import deque
-from services.api_service import APIService
+import threading
+import time
+from config import Config
+from services.flight_graph import FlightGraph
+from services.path_index import PathIndex
 from utils.constants import GEO_COORDS, REGION_MAP
 
 class GraphService:
     
-    def __init__(self, ml_service):
+    def __init__(self, ml_service, snapshot_engine=None):
         self.ml_service = ml_service
+        # When set, predictions come from the latest global risk snapshot
+        self.snapshot_engine = snapshot_engine
+        if snapshot_engine is not None:
+            snapshot_engine.add_listener(lambda snapshot: self.refresh_path_index_async())
+        self.flight_graph = FlightGraph()
+        if Config.AVIATION_KEY:
+            # Merge live Aviation Stack routes into the curated graph without delaying startup
+            threading.Thread(target=self.flight_graph.refresh_from_api, name='flight-graph', daemon=True).start()
+        self.path_index = None
+        self._index_lock = threading.Lock()
+        self._index_rebuilding = False
 
     def build_simulation_bfs(self, start_country, max_depth=2):
         """
@@ -25,15 +39,15 @@ class GraphService:
                 "links": []
             }
         
-        queue = deque([(start_country, 0)])  # (Country, Depth)
         visited = set([start_country])
         
         nodes = []
         links = []
+        snapshot = self.current_snapshot()
         
         # Predict for root
         try:
-            root_pred = self.ml_service.predict_country(start_country)
+            root_pred = self.predict_countries([start_country], snapshot)[start_country]
             nodes.append({
                 "id": start_country, 
                 "group": 0, 
@@ -48,53 +62,105 @@ class GraphService:
                 "links": []
             }
 
-        while queue:
-            current_country, depth = queue.popleft()
+        # Expand one whole depth level at a time so each level is scored with one batched call
+        frontier = [start_country]
+        depth = 0
+        while frontier and depth < max_depth:
+            discovered = []
+            level_links = []
+            discovery_links = {}  # neighbor -> the link that discovered it
             
-            if depth >= max_depth:
-                continue
-
-            # Get neighbors (Flights) - already filtered to dataset countries
-            neighbors = APIService.fetch_flight_connections(current_country)
+            for current_country in frontier:
+                # Get neighbors (Flights) - the compiled graph only holds dataset countries
+                for neighbor in self.flight_graph.neighbors(current_country):
+                    # Add Link
+                    link = {
+                        "source": current_country,
+                        "target": neighbor,
+                        "value": 1  # Weight could be flight volume
+                    }
+                    level_links.append(link)
+                    if neighbor not in visited:
+                        visited.add(neighbor)
+                        discovered.append(neighbor)
+                        discovery_links[neighbor] = link
+            
+            preds = self._predict_level(discovered, snapshot)
             
-            for neighbor in neighbors:
-                # Double-check neighbor is in training dataset
-                if neighbor not in REGION_MAP:
+            for neighbor in discovered:
+                pred = preds.get(neighbor)
+                if pred is None:
                     continue
-                    
-                if neighbor not in visited:
-                    visited.add(neighbor)
-                    queue.append((neighbor, depth + 1))
-                    
-                    # Predict for neighbor
-                    try:
-                        pred = self.ml_service.predict_country(neighbor)
-                        
-                        nodes.append({
-                            "id": neighbor,
-                            "group": depth + 1,
-                            "cases": pred['malaria'],
-                            "risk_level": pred['risk_level'],
-                            "coords": GEO_COORDS.get(neighbor, {'lat': 0, 'lng': 0})
-                        })
-                    except Exception as e:
-                        print(f"Warning: Failed to predict for {neighbor}: {e}")
-                        continue
-                
-                # Add Link
-                links.append({
-                    "source": current_country,
-                    "target": neighbor,
-                    "value": 1  # Weight could be flight volume
+                nodes.append({
+                    "id": neighbor,
+                    "group": depth + 1,
+                    "cases": pred['malaria'],
+                    "risk_level": pred['risk_level'],
+                    "coords": GEO_COORDS.get(neighbor, {'lat': 0, 'lng': 0})
                 })
+            
+            # As before batching: a failed country loses only the link it was discovered through
+            skipped = {id(discovery_links[c]) for c in discovered if c not in preds}
+            links.extend(link for link in level_links if id(link) not in skipped)
+            
+            frontier = discovered
+            depth += 1
         
         return {
             "nodes": nodes, 
             "links": links,
             "total_countries": len(nodes),
-            "max_depth": max_depth
+            "max_depth": max_depth,
+            "snapshot_age_seconds": round(snapshot.age(), 1) if snapshot else None
         }
 
+    def _predict_level(self, countries, snapshot):
+        """One batched prediction for a BFS level; if it fails, each country on its own so one failure stays isolated"""
+        try:
+            return self.predict_countries(countries, snapshot)
+        except Exception as e:
+            print(f"Warning: Batched prediction failed ({e}), predicting countries one by one")
+        preds = {}
+        for country in countries:
+            try:
+                preds.update(self.predict_countries([country], snapshot))
+            except Exception as e:
+                print(f"Warning: Failed to predict for {country}: {e}")
+        return preds
+
+    def current_snapshot(self):
+        return self.snapshot_engine.get() if self.snapshot_engine is not None else None
+
+    def predict_countries(self, countries, snapshot=None):
+        """Predictions from the snapshot where available, live batched predictions for the rest"""
+        if snapshot is None:
+            return self.ml_service.predict_countries(countries)
+        preds = {c: snapshot.predictions[c] for c in countries if c in snapshot.predictions}
+        missing = [c for c in countries if c not in preds]
+        if missing:
+            preds.update(self.ml_service.predict_countries(missing))
+        return preds
+
+    def reachable_countries(self, start):
+        """All dataset countries reachable from start over flight connections (start included)"""
+        reachable = [start]
+        seen = {start}
+        frontier = [start]
+        while frontier:
+            next_frontier = []
+            for country in frontier:
+                for neighbor in self.flight_graph.neighbors(country):
+                    if neighbor not in seen:
+                        seen.add(neighbor)
+                        reachable.append(neighbor)
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+        return reachable
+
+    def build_risk_table(self, countries, snapshot=None):
+        """Predictions for the given countries in one batched pass (countries that fail are left out)"""
+        return self._predict_level(countries, snapshot)
+
     def find_safest_path_a_star(self, start, end):
         """
         Uses A* to find the safest path between two countries.
@@ -119,6 +185,11 @@ class GraphService:
                 "message": "Start and end countries are the same"
             }
         
+        # Risk table: one batched prediction pass over every country reachable from start
+        risk_table = self.build_risk_table(self.reachable_countries(start), self.current_snapshot())
+        if not risk_table:
+            return {"error": "Risk predictions are unavailable, try again later"}
+        
         # Priority Queue: (Estimated_Total_Cost, Current_Cost, Current_Node, Path_History)
         pq = [(0, 0, start, [start])]
         visited = set()
@@ -130,74 +201,164 @@ class GraphService:
             est_total, current_cost, current_node, path = heapq.heappop(pq)
             
             if current_node == end:
-                # Get predictions for all nodes in path for details
-                path_details = []
-                for country in path:
-                    try:
-                        pred = self.ml_service.predict_country(country)
-                        path_details.append({
-                            "country": country,
-                            "malaria_cases": pred['malaria'],
-                            "dengue_cases": pred['dengue'],
-                            "risk_level": pred['risk_level']
-                        })
-                    except Exception as e:
-                        print(f"Warning: Failed to get details for {country}: {e}")
-                        path_details.append({
-                            "country": country,
-                            "malaria_cases": 0,
-                            "error": str(e)
-                        })
-                
                 return {
                     "path": path,
                     "total_risk_cost": round(current_cost, 2),
                     "path_length": len(path),
-                    "path_details": path_details
+                    # Path details reuse the risk table predictions
+                    "path_details": self._path_details(path, risk_table)
                 }
             
             if current_node in visited:
                 continue
             visited.add(current_node)
             
-            # Get flight connections (already filtered to dataset countries)
-            neighbors = APIService.fetch_flight_connections(current_node)
-            
-            for neighbor in neighbors:
-                # Double-check neighbor is in training dataset
-                if neighbor not in REGION_MAP or neighbor in visited:
+            # Get flight connections (compiled graph, dataset countries only)
+            for neighbor in self.flight_graph.neighbors(current_node):
+                if neighbor in visited:
                     continue
                 
-                try:
-                    # Cost = Predicted malaria cases in neighbor (disease risk)
-                    pred = self.ml_service.predict_country(neighbor)
-                    
-                    # Normalize risk: divide by 100 to keep costs reasonable
-                    # Higher malaria cases = higher cost (less safe)
-                    risk_cost = pred['malaria'] / 100.0
-                    
-                    new_cost = current_cost + risk_cost
-                    
-                    # Only proceed if this is a better path to this neighbor
-                    if neighbor in best_cost and new_cost >= best_cost[neighbor]:
-                        continue
-                    best_cost[neighbor] = new_cost
-                    
-                    # Heuristic: Manhattan distance (simplified geographic distance)
-                    c1 = GEO_COORDS.get(neighbor, {'lat': 0, 'lng': 0})
-                    c2 = GEO_COORDS.get(end, {'lat': 0, 'lng': 0})
-                    heuristic = abs(c1['lat'] - c2['lat']) + abs(c1['lng'] - c2['lng'])
-                    
-                    # A* formula: f(n) = g(n) + h(n)
-                    estimated_total = new_cost + heuristic
-                    
-                    heapq.heappush(pq, (estimated_total, new_cost, neighbor, path + [neighbor]))
-                    
-                except Exception as e:
-                    print(f"Warning: Failed to process neighbor {neighbor}: {e}")
+                # Cost = Predicted malaria cases in neighbor (disease risk), from the risk table
+                pred = risk_table.get(neighbor)
+                if pred is None:
+                    print(f"Warning: No prediction for neighbor {neighbor}, skipping")
                     continue
+                
+                # Normalize risk: divide by 100 to keep costs reasonable
+                # Higher malaria cases = higher cost (less safe)
+                risk_cost = pred['malaria'] / 100.0
+                
+                new_cost = current_cost + risk_cost
+                
+                # Only proceed if this is a better path to this neighbor
+                if neighbor in best_cost and new_cost >= best_cost[neighbor]:
+                    continue
+                best_cost[neighbor] = new_cost
+                
+                # Heuristic: Manhattan distance (simplified geographic distance)
+                c1 = GEO_COORDS.get(neighbor, {'lat': 0, 'lng': 0})
+                c2 = GEO_COORDS.get(end, {'lat': 0, 'lng': 0})
+                heuristic = abs(c1['lat'] - c2['lat']) + abs(c1['lng'] - c2['lng'])
+                
+                # A* formula: f(n) = g(n) + h(n)
+                estimated_total = new_cost + heuristic
+                
+                heapq.heappush(pq, (estimated_total, new_cost, neighbor, path + [neighbor]))
                     
         return {
             "error": f"No path found between {start} and {end}",
             "visited_countries": len(visited)
-        }
\ No newline at end of file
+        }
+
+    @staticmethod
+    def _path_details(path, predictions):
+        path_details = []
+        for country in path:
+            pred = predictions.get(country)
+            if pred is None:
+                path_details.append({
+                    "country": country,
+                    "malaria_cases": 0,
+                    "error": "Prediction unavailable"
+                })
+                continue
+            path_details.append({
+                "country": country,
+                "malaria_cases": pred['malaria'],
+                "dengue_cases": pred['dengue'],
+                "risk_level": pred['risk_level']
+            })
+        return path_details
+
+    def find_safest_path(self, start, end):
+        """
+        Safest path lookup from the all-pairs path index (see services/path_index.py).
+        Falls back to a per-request A* search when PATH_INDEX_ENABLED is off.
+        """
+        if not Config.PATH_INDEX_ENABLED:
+            return self.find_safest_path_a_star(start, end)
+        
+        if start not in REGION_MAP:
+            return {"error": f"Start country '{start}' not found in training dataset"}
+        if end not in REGION_MAP:
+            return {"error": f"End country '{end}' not found in training dataset"}
+        
+        if start == end:
+            return {
+                "path": [start],
+                "total_risk_cost": 0,
+                "message": "Start and end countries are the same"
+            }
+        
+        index = self.get_path_index()
+        if index is None:
+            return {"error": "Risk predictions are unavailable, try again later"}
+        path, cost = index.path(start, end)
+        if path is None:
+            return {"error": f"No path found between {start} and {end}"}
+        
+        return {
+            "path": path,
+            "total_risk_cost": round(cost, 2),
+            "path_length": len(path),
+            "path_details": self._path_details(path, index.predictions),
+            "index_age_seconds": round(index.age(), 1),
+            "snapshot_age_seconds": round(time.time() - index.predicted_at, 1)
+        }
+
+    def get_path_index(self):
+        """
+        Current path index. The first call builds it; afterwards a stale index (older than
+        PATH_INDEX_TTL) is still served while a rebuild runs in the background. With a
+        snapshot engine the index is also rebuilt whenever a new snapshot is published.
+        None when it can't be built yet (retried on the next call).
+        """
+        index = self.path_index
+        if index is None:
+            with self._index_lock:
+                if self.path_index is None:
+                    try:
+                        self.path_index = self._build_path_index(None)
+                    except Exception as e:
+                        print(f"Warning: Path index build failed: {e}")
+                return self.path_index
+        if index.age() > Config.PATH_INDEX_TTL:
+            self.refresh_path_index_async()
+        return index
+
+    def refresh_path_index_async(self):
+        with self._index_lock:
+            if self._index_rebuilding:
+                return
+            self._index_rebuilding = True
+        
+        def rebuild():
+            try:
+                self.path_index = self._build_path_index(self.path_index)
+            except Exception as e:
+                print(f"Warning: Path index rebuild failed: {e}")
+            finally:
+                self._index_rebuilding = False
+        
+        threading.Thread(target=rebuild, name='path-index', daemon=True).start()
+
+    def _build_path_index(self, current):
+        """Snapshot risks for every graph country and (re)build the index if risks or edges changed"""
+        start_time = time.time()
+        graph = self.flight_graph
+        snapshot = self.current_snapshot()
+        if snapshot is not None:
+            predictions, predicted_at = snapshot.predictions, snapshot.created_at
+        else:
+            predictions, predicted_at = self.build_risk_table(graph.countries), time.time()
+        if not predictions:
+            # An index without risks would answer "No path found" for every pair until the next rebuild
+            raise RuntimeError("no risk predictions available")
+        
+        if current is not None and current.matches(graph, predictions):
+            # Same edges and risk costs: keep the matrices, take the new predictions
+            return current.with_predictions(graph, predictions, predicted_at)
+        
+        index = PathIndex(graph, predictions, predicted_at)
+        print(f"Path index built: {len(graph.countries)} countries in {time.time() - start_time:.2f}s")
+        return index
@@ -0,0 +1,142 @@
+"""
+Pooled HTTP sessions with retries and a per-host circuit breaker for upstream APIs.
+"""
+import threading
+import time
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import Config
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a host whose circuit breaker is open"""
+    pass
+
+
+class CircuitBreaker:
+    """
+    closed    -> requests flow; `failure_threshold` consecutive failures open the circuit
+    open      -> requests fail fast until `reset_timeout` seconds have passed
+    half_open -> one trial request; success closes the circuit, failure re-opens it
+    """
+    def __init__(self, host, failure_threshold=3, reset_timeout=30.0):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.total_failures = 0
+        self.total_successes = 0
+        self.rejected = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+                self._trial_in_flight = False
+            if self.state == 'closed':
+                return True
+            if self.state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.total_successes += 1
+            self.consecutive_failures = 0
+            self.state = 'closed'
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.total_failures += 1
+            self.consecutive_failures += 1
+            if self.state == 'half_open' or self.consecutive_failures >= self.failure_threshold:
+                if self.state != 'open':
+                    print(f"Circuit breaker OPEN for {self.host}")
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'total_failures': self.total_failures,
+                'total_successes': self.total_successes,
+                'rejected': self.rejected,
+                'open_for_seconds': round(time.monotonic() - self.opened_at, 1) if self.state == 'open' else 0.0
+            }
+
+
+class HTTPClient:
+    _sessions = {}
+    _breakers = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _session(host):
+        with HTTPClient._lock:
+            session = HTTPClient._sessions.get(host)
+            if session is None:
+                retry = Retry(
+                    total=Config.HTTP_RETRIES,
+                    read=0,  # A read timeout is a slow host: retrying only multiplies the wait
+                    backoff_factor=Config.HTTP_BACKOFF,
+                    status_forcelist=[429, 502, 503, 504],
+                    allowed_methods=['GET'],
+                    raise_on_status=False,  # Hand the last response back so the breaker can see it
+                    respect_retry_after_header=False  # Never sleep longer than our own backoff
+                )
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=Config.HTTP_POOL_SIZE, max_retries=retry)
+                session = requests.Session()
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                HTTPClient._sessions[host] = session
+            return session
+
+    @staticmethod
+    def _breaker(host):
+        with HTTPClient._lock:
+            breaker = HTTPClient._breakers.get(host)
+            if breaker is None:
+                breaker = HTTPClient._breakers[host] = CircuitBreaker(
+                    host, Config.BREAKER_FAILURE_THRESHOLD, Config.BREAKER_RESET_TIMEOUT
+                )
+            return breaker
+
+    @staticmethod
+    def get(url, timeout=5, **kwargs):
+        """
+        GET through the host's pooled keep-alive session.
+        Raises CircuitOpenError without touching the network while the host is unhealthy.
+        """
+        host = urlparse(url).netloc
+        breaker = HTTPClient._breaker(host)
+        if not breaker.allow():
+            raise CircuitOpenError(f"circuit open for {host}")
+        try:
+            response = HTTPClient._session(host).get(url, timeout=(Config.HTTP_CONNECT_TIMEOUT, timeout), **kwargs)
+        except requests.RequestException:
+            breaker.record_failure()
+            raise
+        # 4xx (e.g. a bad API key) means the host is up; only server errors count against it
+        if response.status_code >= 500 or response.status_code == 429:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+    @staticmethod
+    def breaker_stats():
+        with HTTPClient._lock:
+            breakers = dict(HTTPClient._breakers)
+        return {host: breaker.stats() for host, breaker in breakers.items()}
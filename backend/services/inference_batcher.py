@@ -0,0 +1,94 @@
+"""
+Dynamic micro-batching for model inference.
+
+Concurrent requests each hand their feature rows to the batcher instead of
+calling the model themselves. A single worker thread collects pending rows for
+a short window (or until the batch is full), runs one forward pass over the
+stacked matrix and hands each request its slice of the output.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+
+
+class MicroBatcher:
+    def __init__(self, predict_fn, window_ms=3.0, max_batch=256, name='inference'):
+        """
+        predict_fn: callable taking an (n, features) matrix and returning (n, outputs)
+        window_ms:  how long to wait for more rows after the first one arrives
+        max_batch:  row limit per forward pass; larger requests run directly
+        """
+        self.predict_fn = predict_fn
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._rows = 0
+        self._requests = 0
+        self._largest = 0
+        self._worker = threading.Thread(target=self._run, name=f'{name}-batcher', daemon=True)
+        self._worker.start()
+
+    def predict(self, X):
+        """Model output for X, computed together with whatever other requests are pending"""
+        X = np.asarray(X)
+        if len(X) >= self.max_batch:
+            return self.predict_fn(X)
+        future = Future()
+        self._queue.put((X, future))
+        return future.result()
+
+    def _run(self):
+        carry = None  # A request that didn't fit the previous batch starts the next one
+        while True:
+            pending = [carry if carry is not None else self._queue.get()]
+            carry = None
+            rows = len(pending[0][0])
+            deadline = time.monotonic() + self.window
+            while rows < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if rows + len(item[0]) > self.max_batch:
+                    carry = item
+                    break
+                pending.append(item)
+                rows += len(item[0])
+            self._execute(pending, rows)
+
+    def _execute(self, pending, rows):
+        try:
+            X = pending[0][0] if len(pending) == 1 else np.concatenate([x for x, _ in pending])
+            output = self.predict_fn(X)
+        except Exception as e:
+            for _, future in pending:
+                future.set_exception(e)
+            return
+        start = 0
+        for x, future in pending:
+            future.set_result(output[start:start + len(x)])
+            start += len(x)
+        with self._lock:
+            self._batches += 1
+            self._rows += rows
+            self._requests += len(pending)
+            self._largest = max(self._largest, rows)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'batches': self._batches,
+                'requests': self._requests,
+                'rows': self._rows,
+                'avg_batch_rows': round(self._rows / self._batches, 2) if self._batches else 0.0,
+                'largest_batch_rows': self._largest,
+                'window_ms': self.window * 1000.0,
+                'max_batch': self.max_batch
+            }
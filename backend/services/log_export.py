@@ -0,0 +1,61 @@
+"""
+Streaming encoders for prediction log exports.
+
+Each encoder turns an iterator of log dicts into an iterator of text chunks
+(one chunk per batch of rows), and gzip_chunks compresses a chunk stream on
+the fly, so an export never holds more than one batch in memory.
+"""
+import csv
+import io
+import json
+import zlib
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+
+def _batched(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def ndjson_chunks(rows, batch_size=500):
+    """One JSON object per line"""
+    for batch in _batched(rows, batch_size):
+        yield ''.join(json.dumps(row, separators=(',', ':')) + '\n' for row in batch)
+
+
+def csv_chunks(rows, columns, batch_size=500):
+    """Header row, then one line per log; a 'features' dict is written as a JSON cell"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for batch in _batched(rows, batch_size):
+        for row in batch:
+            writer.writerow([
+                json.dumps(row.get(c), separators=(',', ':')) if c == 'features' else row.get(c)
+                for c in columns
+            ])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()  # Header only (no rows)
+
+
+def gzip_chunks(chunks, level=6):
+    """Gzip-compress a stream of text chunks incrementally"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
@@ -1,141 +1,301 @@
-import joblib
-import tensorflow as tf
+import threading
+import time
 import numpy as np
-import pandas as pd
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from config import Config
 from utils.constants import REGION_MAP
 from services.api_service import APIService
+from services.feature_builder import FeatureBuilder, HISTORY_KEYS
+from services.feature_store import FeatureStore
+from services.numpy_model import NumpyModel
+from services.model_artifact import load_model_artifact
+from services.inference_batcher import MicroBatcher
+from services.cache import SingleFlight
 from models.prediction_log import PredictionLogger
 
-class MLService:
+
+class ModelNotReadyError(RuntimeError):
+    """Raised when a prediction is requested before the model is loaded"""
+
+
+class _FetchClock:
+    """Deadline of one country's fetches, started by the first of them to run"""
     def __init__(self):
+        self._started = threading.Event()
+        self._deadline = None
+
+    def wrap(self, fetch):
+        def run(country):
+            if not self._started.is_set():
+                self._deadline = time.monotonic() + Config.PREDICTION_FETCH_DEADLINE
+                self._started.set()
+            return fetch(country)
+        return run
+
+    def deadline(self, start_timeout=None):
+        """Monotonic deadline; if nothing starts within start_timeout the deadline is now"""
+        if not self._started.wait(start_timeout):
+            return time.monotonic()
+        return self._deadline
+
+
+class MLService:
+    def __init__(self, load=True):
+        """load=False defers load_artifacts() / warm_up() to the caller (e.g. a startup thread)"""
         self.model = None
         self.scaler_X = None
         self.scaler_y = None
         self.feature_names = []
+        self.feature_builder = None
+        self.artifact = None
+        self.feature_store = FeatureStore() if Config.FEATURE_STORE_ENABLED else None
         self.logger = PredictionLogger()
-        self.load_artifacts()
+        # Upstream fetches for a prediction run concurrently on this pool; background and bulk
+        # predictions use their own bounded pool so they never queue ahead of user requests
+        self.fetch_pool = ThreadPoolExecutor(max_workers=Config.FETCH_WORKERS, thread_name_prefix='fetch')
+        self.bulk_fetch_pool = ThreadPoolExecutor(max_workers=Config.BULK_FETCH_WORKERS, thread_name_prefix='bulk-fetch')
+        self.engine = None
+        self.ready = False
+        self.load_error = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        # Concurrent predictions share forward passes through the micro-batcher
+        self.batcher = MicroBatcher(
+            self._forward, Config.INFERENCE_BATCH_WINDOW_MS, Config.INFERENCE_MAX_BATCH
+        ) if Config.INFERENCE_BATCHING_ENABLED else None
+        # Identical in-flight predictions (same country and feature epoch) share one computation
+        self.inflight = SingleFlight('predictions') if Config.PREDICTION_COALESCING_ENABLED else None
+        if load and self.load_artifacts():
+            self.warm_up()
 
     def load_artifacts(self):
+        """Load the model and feature layout; returns False (and records the error) on failure"""
+        start = time.time()
         try:
-            self.scaler_X = joblib.load(Config.SCALER_X_PATH)
-            self.scaler_y = joblib.load(Config.SCALER_Y_PATH)
-            self.feature_names = list(self.scaler_X.feature_names_in_)
-            self.model = tf.keras.models.load_model(Config.MODEL_PATH, compile=False)
-            print("Artifacts Loaded.")
+            engine = Config.INFERENCE_ENGINE
+            if engine == 'fused':
+                # One memory-mapped file: fused weights, feature order and one-hot index
+                self.artifact = load_model_artifact()
+                if self.artifact is None:
+                    print("Model artifact unavailable, using numpy engine with sklearn scalers")
+                    engine = 'numpy'
+            if engine == 'fused':
+                self.model = self.artifact.model
+                self.feature_names = self.artifact.feature_names
+                self.feature_builder = FeatureBuilder(self.feature_names, self.artifact.onehot)
+            else:
+                import joblib
+                self.scaler_X = joblib.load(Config.SCALER_X_PATH)
+                self.scaler_y = joblib.load(Config.SCALER_Y_PATH)
+                self.model = self._load_model(engine)
+                self.feature_names = list(self.scaler_X.feature_names_in_)
+                self.feature_builder = FeatureBuilder(self.feature_names)
+            self.engine = engine
+            self.load_seconds = time.time() - start
+            self.load_error = None
+            print(f"Artifacts Loaded ({engine} engine) in {self.load_seconds:.2f}s.")
+            return True
         except Exception as e:
+            self.model = None
+            self.load_error = str(e)
             print(f"Error loading ML artifacts: {e}")
+            return False
+
+    def warm_up(self, rows=8):
+        """
+        Push a dummy batch through the feature builder and model (no upstream calls), so
+        lazy initialization happens before traffic arrives. Marks the service ready.
+        """
+        if self.model is None:
+            return False
+        start = time.time()
+        try:
+            countries = list(REGION_MAP)[:rows]
+            inputs = {
+                'temp': 25.0, 'precip': 0.0, 'humidity': 60, 'density': 100.0,
+                'vector_index': 0.0, 'water_stagnation': 0.0,
+                'historical_data': {key: 0.0 for key in HISTORY_KEYS}
+            }
+            X = self.feature_builder.build_matrix(countries, [inputs] * len(countries), datetime.now())
+            preds = self._predict_matrix(X)
+            if preds.shape != (len(countries), 2) or not np.all(np.isfinite(preds)):
+                raise ValueError(f"unexpected warm-up output {preds.shape}")
+        except Exception as e:
+            self.load_error = f"warm-up failed: {e}"
+            print(f"Model warm-up failed: {e}")
+            return False
+        self.warmup_seconds = time.time() - start
+        self.ready = True
+        print(f"Model warmed up in {self.warmup_seconds * 1000:.1f}ms")
+        return True
+
+    def status(self):
+        return {
+            'ready': self.ready,
+            'engine': self.engine,
+            'model_version': self.artifact.version if self.artifact else None,
+            'load_seconds': round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            'warmup_seconds': round(self.warmup_seconds, 3) if self.warmup_seconds is not None else None,
+            'error': self.load_error,
+            'batching': self.batcher.stats() if self.batcher else None,
+            'coalescing': self.inflight.stats() if self.inflight else None,
+            'logging': self.logger.stats()
+        }
+
+    @staticmethod
+    def _load_model(engine):
+        """Model with a keras-style predict(X, verbose=0); TensorFlow is only imported for 'keras'"""
+        if engine == 'keras':
+            import tensorflow as tf
+            return tf.keras.models.load_model(Config.MODEL_PATH, compile=False)
+        if engine != 'numpy':
+            print(f"Unknown INFERENCE_ENGINE '{engine}', using numpy")
+        return NumpyModel.from_h5(Config.MODEL_PATH)
 
     def predict_country(self, country):
-        # 1. Fetch Features from APIs
-        temp, precip, humidity = APIService.fetch_weather(country)  # Now returns humidity
-        density = APIService.fetch_population_density(country)
-        historical_data = APIService.fetch_historical_disease_data(country)  # Get proper lag data from WHO
-        
-        # Calculate derived features
-        vector_index = APIService.calculate_vector_index(temp, humidity, precip)
-        water_stagnation = APIService.calculate_water_stagnation_index(precip, temp)
+        return self.predict_countries([country])[country]
+
+    def feature_epoch(self):
+        """
+        Identifies the inputs a prediction is computed from: the model version and the
+        current weather cache window. Predictions are only coalesced within one epoch.
+        """
+        model_version = self.artifact.version if self.artifact else self.engine
+        return model_version, int(time.time() // Config.WEATHER_CACHE_TTL)
+
+    def predict_countries(self, countries, background=False, log=True, features_out=None):
+        """
+        Predict for several countries with a single scaler/model pass.
+        Countries another request is already predicting (same feature epoch) are not
+        recomputed; their result is shared. Returns {country: prediction} in input order.
         
-        # 2. Build Feature Vector
-        features = {name: 0.0 for name in self.feature_names}
+        background=True (snapshot refreshes, bulk requests) fetches on the bulk pool and
+        without a queueing limit, and doesn't claim in-flight keys, so user requests never
+        wait on a slow bulk run. log=False skips the prediction log (scheduler traffic such
+        as snapshot refreshes); such runs don't join in-flight keys either. features_out, if
+        given, receives {country: named features} so those predictions can be logged when served.
+        """
+        if self.model is None:
+            raise ModelNotReadyError(self.load_error or "Model is not loaded")
+        countries = list(dict.fromkeys(countries))  # De-duplicate, keep order
+        if not countries:
+            return {}
+        if self.inflight is None or background or not log:
+            return self._predict_batch(countries, background, log, features_out)
+
+        epoch = self.feature_epoch()
+        owned, waiting = self.inflight.claim([(country, epoch) for country in countries])
+        results, error = {}, None
+        try:
+            if owned:
+                results = self._predict_batch([country for country, _ in owned])
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            for key, flight in owned.items():
+                self.inflight.resolve(key, flight, results.get(key[0]), error)
+        for (country, _), flight in waiting.items():
+            results[country] = self.inflight.wait(flight)
+        return {country: results[country] for country in countries}
+
+    def _predict_batch(self, countries, background=False, log=True, features_out=None):
+        """Fetch, build, predict, format and log a batch of (unique) countries"""
+        # 1. Fetch inputs and write all feature vectors into one preallocated matrix
+        inputs_list = self._collect_inputs(countries, background)
         now = datetime.now()
-        
-        # Time-based features
-        # NOTE: Training data is 2000-2023, so cap year at 2023 to match training distribution
-        features['year'] = min(now.year, 2023)
-        features['month'] = now.month
-        features['quarter'] = (now.month - 1) // 3 + 1
-        features['month_sin'] = np.sin(2 * np.pi * now.month / 12)
-        features['month_cos'] = np.cos(2 * np.pi * now.month / 12)
-        
-        # Weather features (now includes humidity from OpenWeatherMap)
-        features['avg_temp_c'] = temp
-        features['precipitation_mm'] = precip
-        features['humidity_pct'] = humidity  # NEW: fetched from weather API
-        
-        # Derived environmental features
-        features['vector_index'] = vector_index  # NEW: calculated from temp/humidity/precip
-        features['water_stagnation_index'] = water_stagnation  # NEW: calculated from precip/temp
-        
-        # Population and health features
-        features['population_density'] = density
-        features['air_quality_index'] = 50.0  # Default moderate AQI
-        features['uv_index'] = 6.0  # Default moderate UV
-        # Healthcare budget: training range is 205-4969, use median value
-        features['healthcare_budget'] = 2750.0  # Approximate median from training data
-        
-        # Lag features from WHO historical data (properly differentiated)
-        features['malaria_cases_lag_1'] = historical_data['lag_1']
-        features['malaria_cases_lag_2'] = historical_data['lag_2']
-        features['malaria_cases_lag_3'] = historical_data['lag_3']
-        features['malaria_cases_lag_6'] = historical_data['lag_6']
-        features['malaria_cases_lag_12'] = historical_data['lag_12']
-        
-        # Rolling statistics from WHO historical data
-        features['malaria_cases_roll_mean_3'] = historical_data['roll_mean_3']
-        features['malaria_cases_roll_mean_6'] = historical_data['roll_mean_6']
-        features['malaria_cases_roll_mean_12'] = historical_data['roll_mean_12']
-        features['malaria_cases_roll_std_3'] = historical_data['roll_std_3']
-        features['malaria_cases_roll_std_6'] = historical_data['roll_std_6']
-        features['malaria_cases_roll_std_12'] = historical_data['roll_std_12']
-        
-        # Also set dengue lag features if they exist
-        for key in ['lag_1', 'lag_2', 'lag_3', 'lag_6', 'lag_12']:
-            dengue_key = f'dengue_cases_{key}'
-            if dengue_key in features:
-                features[dengue_key] = historical_data[key] * 0.3  # Dengue typically lower
-        
-        for key in ['roll_mean_3', 'roll_mean_6', 'roll_mean_12', 'roll_std_3', 'roll_std_6', 'roll_std_12']:
-            dengue_key = f'dengue_cases_{key}'
-            if dengue_key in features:
-                features[dengue_key] = historical_data[key] * 0.3
-        
-        # Handle any generic lag columns that might exist with different naming
-        for col in self.feature_names:
-            if 'lag' in col.lower() and features[col] == 0.0:
-                if '1' in col:
-                    features[col] = historical_data['lag_1']
-                elif '2' in col:
-                    features[col] = historical_data['lag_2']
-                elif '3' in col:
-                    features[col] = historical_data['lag_3']
-                elif '6' in col:
-                    features[col] = historical_data['lag_6']
-                elif '12' in col:
-                    features[col] = historical_data['lag_12']
-            elif 'roll' in col.lower() and features[col] == 0.0:
-                if 'mean' in col.lower():
-                    if '3' in col:
-                        features[col] = historical_data['roll_mean_3']
-                    elif '6' in col:
-                        features[col] = historical_data['roll_mean_6']
-                    elif '12' in col:
-                        features[col] = historical_data['roll_mean_12']
-                elif 'std' in col.lower():
-                    if '3' in col:
-                        features[col] = historical_data['roll_std_3']
-                    elif '6' in col:
-                        features[col] = historical_data['roll_std_6']
-                    elif '12' in col:
-                        features[col] = historical_data['roll_std_12']
+        X = self.feature_builder.build_matrix(countries, inputs_list, now)
+
+        # 2. Make Predictions
+        preds = self._predict_matrix(X)
 
-        # One-hot Encodings for country and region
-        if f"country_{country}" in features: features[f"country_{country}"] = 1.0
-        reg = REGION_MAP.get(country)
-        if reg and f"region_{reg}" in features: features[f"region_{reg}"] = 1.0
+        # 3. Format, log and return per-country results
+        results = {}
+        for country, inputs, pred in zip(countries, inputs_list, preds):
+            features = self.feature_builder.named_features(country, inputs, now)
+            if features_out is not None:
+                features_out[country] = features
+            results[country] = self._format_prediction(country, inputs, features, pred, log)
+        return results
 
-        # 3. Make Prediction
-        df_in = pd.DataFrame([features])[self.feature_names]
-        X_scaled = self.scaler_X.transform(df_in)
+    def _predict_matrix(self, X):
+        """Model output for a raw feature matrix, micro-batched with concurrent requests when enabled"""
+        if self.batcher is not None:
+            return self.batcher.predict(X)
+        return self._forward(X)
+
+    def _forward(self, X):
+        """One fused forward pass, or transform / predict / inverse_transform"""
+        if getattr(self.model, 'includes_scaling', False):
+            return self.model.predict(X)
+        import pandas as pd
+        X_scaled = self.scaler_X.transform(pd.DataFrame(X, columns=self.feature_names, copy=False))
         preds_scaled = self.model.predict(X_scaled, verbose=0)
-        preds = self.scaler_y.inverse_transform(preds_scaled)
-        
+        return self.scaler_y.inverse_transform(preds_scaled)
+
+    def _collect_inputs(self, countries, background=False):
+        """
+        Fetch upstream data for the countries and derive the environmental indices.
+        All weather / population / WHO fetches are issued concurrently. Each country has
+        its own PREDICTION_FETCH_DEADLINE, starting when its first fetch begins running,
+        so a large batch queueing on the pool doesn't eat into later countries' budgets.
+        A fetch that fails or misses its deadline falls back to baseline values.
+        """
+        pool = self.bulk_fetch_pool if background else self.fetch_pool
+        # User requests also bound the wait for a pool slot; background work just queues
+        start_timeout = None if background else Config.PREDICTION_FETCH_DEADLINE
+        pending = []
+        for country in countries:
+            # Real monthly lags from the offline feature store; WHO only for countries it lacks
+            stored_history = self.feature_store.get(country) if self.feature_store else None
+            clock = _FetchClock()
+            pending.append((country, stored_history, clock, (
+                pool.submit(clock.wrap(APIService.fetch_weather), country),
+                pool.submit(clock.wrap(APIService.fetch_population_density), country),
+                None if stored_history else pool.submit(clock.wrap(APIService.fetch_historical_disease_data), country)
+            )))
+
+        inputs_list = []
+        for country, stored_history, clock, (weather_f, density_f, history_f) in pending:
+            deadline = clock.deadline(start_timeout)
+            temp, precip, humidity = self._await(weather_f, deadline, APIService.baseline_weather, country)
+            density = self._await(density_f, deadline, APIService.baseline_population_density, country)
+            historical_data = stored_history or self._await(history_f, deadline, APIService.baseline_historical_data, country)
+            
+            # Calculate derived features
+            vector_index = APIService.calculate_vector_index(temp, humidity, precip)
+            water_stagnation = APIService.calculate_water_stagnation_index(precip, temp)
+            
+            inputs_list.append({
+                'temp': temp, 'precip': precip, 'humidity': humidity, 'density': density,
+                'vector_index': vector_index, 'water_stagnation': water_stagnation,
+                'historical_data': historical_data
+            })
+        return inputs_list
+
+    @staticmethod
+    def _await(future, deadline, fallback, country):
+        """Result of a fetch future, or the fallback if it errors or the deadline passes"""
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except Exception as e:
+            future.cancel()  # Don't leave a fetch nobody waits for queued on the pool
+            print(f"Fetch for {country} failed or timed out ({type(e).__name__}), using fallback")
+            return fallback(country)
+
+    def _format_prediction(self, country, inputs, features, pred, log=True):
+        """Turn one row of model output into the API prediction dict and log it (unless log=False)"""
+        temp, precip, humidity = inputs['temp'], inputs['precip'], inputs['humidity']
+        density = inputs['density']
+        vector_index, water_stagnation = inputs['vector_index'], inputs['water_stagnation']
+        historical_data = inputs['historical_data']
+
         # Prepare comprehensive prediction results
         predictions = {
-            'malaria': max(0, int(preds[0][0])),
-            'dengue': max(0, int(preds[0][1])),
-            'risk_level': 'High' if preds[0][0] > 50000 else 'Medium' if preds[0][0] > 10000 else 'Low',
+            'malaria': max(0, int(pred[0])),
+            'dengue': max(0, int(pred[1])),
+            'risk_level': 'High' if pred[0] > 50000 else 'Medium' if pred[0] > 10000 else 'Low',
             'features_used': {
                 # Environmental Features
                 'temperature': round(temp, 1),
@@ -167,6 +327,9 @@ class MLService:
             }
         }
         
+        if not log:
+            return predictions
+        
         # Log all features to database
         try:
             self.logger.log_prediction(country, features, predictions)
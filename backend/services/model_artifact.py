@@ -0,0 +1,216 @@
+"""
+Single memory-mappable serving artifact.
+
+Packs everything serving needs into one versioned flat binary file: the fused
+network weights (scalers and batch norms folded in), the scaler parameters, the
+feature column order and the country / region one-hot index. Layout:
+
+    magic (8 bytes) | format version (uint32) | header length (uint32)
+    header (UTF-8 JSON: versions, sources, feature names, array table)
+    arrays, each starting at a 64-byte aligned offset
+
+Serving memory-maps the file read-only and uses the arrays in place, so worker
+processes share the same pages and cold start is a header parse.
+
+Package with:  python -m services.model_artifact
+"""
+import hashlib
+import json
+import os
+import struct
+import time
+import uuid
+from contextlib import contextmanager
+import numpy as np
+from config import Config
+from utils.constants import REGION_MAP
+from services.numpy_model import NumpyModel, build_fused_model, source_paths
+
+MAGIC = b'DZANNART'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+PREAMBLE = struct.Struct('<8sII')
+LOCK_TIMEOUT = 300  # Seconds to wait for another process's packaging (older locks are stale)
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _sources_digest(paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def _onehot_index(feature_names):
+    """(countries, int32 array of [country column, region column]) with -1 for dropped columns"""
+    index = {name: i for i, name in enumerate(feature_names)}
+    countries = sorted(set(REGION_MAP) | {c[len('country_'):] for c in feature_names if c.startswith('country_')})
+    positions = np.array([
+        (index.get(f'country_{country}', -1),
+         index.get(f'region_{REGION_MAP[country]}', -1) if country in REGION_MAP else -1)
+        for country in countries
+    ], dtype=np.int32).reshape(-1, 2)
+    return countries, positions
+
+
+def write_artifact(path, model, scalers, extra_header=None):
+    """Write a fused NumpyModel plus scaler parameters and one-hot index to `path` (atomically)"""
+    if not model.includes_scaling or any(layer[0] != 'dense' for layer in model.layers):
+        raise ValueError("Only fused (Dense-only, scalers folded in) models can be packaged")
+    countries, onehot = _onehot_index(model.feature_names)
+
+    arrays = {}
+    for i, (_, kernel, bias, _) in enumerate(model.layers):
+        arrays[f'kernel_{i}'] = np.ascontiguousarray(kernel, dtype=model.dtype)
+        arrays[f'bias_{i}'] = np.ascontiguousarray(bias, dtype=model.dtype)
+    for name, values in scalers.items():
+        arrays[f'scaler_{name}'] = np.ascontiguousarray(values, dtype=np.float64)
+    arrays['onehot'] = onehot
+
+    # Offsets are relative to the start of the data section (after the header)
+    table, offset = {}, 0
+    for name, array in arrays.items():
+        table[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset = _align(offset + array.nbytes)
+
+    header = dict(extra_header or {}, **{
+        'activations': [layer[3] for layer in model.layers],
+        'feature_names': list(model.feature_names),
+        'onehot_countries': countries,
+        'arrays': table,
+        'built_at': time.time()
+    })
+    header_bytes = json.dumps(header).encode('utf-8')
+    data_start = _align(PREAMBLE.size + len(header_bytes))
+
+    # Unique per writer so concurrent packagers never write into the same file
+    tmp_path = f'{path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+            f.write(header_bytes)
+            for name, array in arrays.items():
+                f.seek(data_start + table[name]['offset'])
+                f.write(array.tobytes())
+            f.truncate(data_start + offset)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    # Replace, don't overwrite: workers mapping the old file keep their pages
+    os.replace(tmp_path, path)
+    return path
+
+
+def package_artifact(path=None):
+    """Fuse and verify the model from the .h5 / scaler files and write the artifact; None on failure"""
+    path = path or Config.MODEL_ARTIFACT_PATH
+    result = build_fused_model()
+    if result is None:
+        return None
+    model, scalers, max_abs_diff = result
+    sources = source_paths()
+    write_artifact(path, model, scalers, {
+        'model_version': _sources_digest(sources),
+        'sources': [os.path.basename(p) for p in sources],
+        'max_abs_diff': max_abs_diff
+    })
+    print(f"Model artifact written: {path} ({os.path.getsize(path)} bytes)")
+    return path
+
+
+class ModelArtifact:
+    def __init__(self, path=None):
+        self.path = path or Config.MODEL_ARTIFACT_PATH
+        self._buffer = np.memmap(self.path, dtype=np.uint8, mode='r')
+        magic, version, header_len = PREAMBLE.unpack(self._buffer[:PREAMBLE.size].tobytes())
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a model artifact")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported model artifact format {version} (expected {FORMAT_VERSION})")
+        self.header = json.loads(self._buffer[PREAMBLE.size:PREAMBLE.size + header_len].tobytes())
+        self._data_start = _align(PREAMBLE.size + header_len)
+
+        self.version = self.header.get('model_version')
+        self.feature_names = self.header['feature_names']
+        onehot = self.array('onehot')
+        self.onehot = {country: (int(c), int(r)) for country, (c, r) in zip(self.header['onehot_countries'], onehot)}
+        self.scalers = {name[len('scaler_'):]: self.array(name) for name in self.header['arrays'] if name.startswith('scaler_')}
+        layers = [('dense', self.array(f'kernel_{i}'), self.array(f'bias_{i}'), activation)
+                  for i, activation in enumerate(self.header['activations'])]
+        self.model = NumpyModel(layers, dtype=layers[0][1].dtype.type, includes_scaling=True,
+                                feature_names=self.feature_names)
+
+    def array(self, name):
+        """Read-only view of a stored array (no copy; backed by the mapped file)"""
+        spec = self.header['arrays'][name]
+        start = self._data_start + spec['offset']
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'], dtype=np.int64))
+        return self._buffer[start:start + count * dtype.itemsize].view(dtype).reshape(spec['shape'])
+
+    def stats(self):
+        return {
+            'path': os.path.basename(self.path),
+            'model_version': self.version,
+            'format_version': FORMAT_VERSION,
+            'bytes': int(self._buffer.size),
+            'built_at': self.header.get('built_at')
+        }
+
+
+@contextmanager
+def _packaging_lock(path, timeout=LOCK_TIMEOUT):
+    """Cross-process lock (an O_EXCL lock file) so only one worker packages at a time"""
+    lock_path = f'{path}.lock'
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > timeout:
+                    os.remove(lock_path)  # Left behind by a crashed packager
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Timed out waiting for {lock_path}")
+            time.sleep(0.2)
+    try:
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        yield
+    finally:
+        os.remove(lock_path)
+
+
+def _needs_packaging(path):
+    if not os.path.exists(path):
+        return True
+    sources = [p for p in source_paths() if os.path.exists(p)]
+    return bool(sources) and os.path.getmtime(path) < max(os.path.getmtime(p) for p in sources)
+
+
+def load_model_artifact(path=None):
+    """
+    Memory-map the serving artifact. It is (re)packaged first when missing, or when the
+    .h5 / scaler files are present and newer; deployments can ship the artifact alone.
+    Workers starting together package it once: the others wait on the lock and then
+    map the finished file.
+    """
+    path = path or Config.MODEL_ARTIFACT_PATH
+    if _needs_packaging(path):
+        with _packaging_lock(path):
+            if _needs_packaging(path) and package_artifact(path) is None:  # Re-check: another worker may be done
+                return None
+    return ModelArtifact(path)
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(0 if package_artifact() is not None else 1)
@@ -0,0 +1,200 @@
+"""
+Pure-NumPy inference for the Keras disease ANN.
+
+Reads the layer graph (model_config) and weights straight from the .h5 file
+with h5py and runs the forward pass as NumPy matmuls, so serving does not need
+TensorFlow. Supports the layers the model uses: Dense, BatchNormalization
+(inference mode, moving statistics) and Dropout (identity at inference).
+
+The fused variant folds scaler_X into the first Dense layer, every batch norm
+into the Dense layer after it and scaler_y into the output layer, so raw
+features go in and case counts come out of one chain of matmuls.
+
+Check parity against Keras with:  python -m services.numpy_model
+(the fused model is packaged by services.model_artifact)
+"""
+import json
+import numpy as np
+from config import Config
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0, out=x),
+    'sigmoid': lambda x: 1.0 / (1.0 + np.exp(-x)),
+    'tanh': np.tanh,
+}
+
+# Layers that are no-ops at inference time
+PASSTHROUGH_LAYERS = {'InputLayer', 'Dropout'}
+
+
+class NumpyModel:
+    def __init__(self, layers, dtype=np.float32, includes_scaling=False, feature_names=None):
+        """
+        layers:           list of ('dense', kernel, bias, activation) / ('batchnorm', scale, offset)
+        includes_scaling: True if the input / output scalers are folded into the weights
+        feature_names:    input column order (set on fused models)
+        """
+        self.layers = layers
+        self.dtype = dtype
+        self.includes_scaling = includes_scaling
+        self.feature_names = feature_names
+
+    @classmethod
+    def from_h5(cls, path=None):
+        import h5py
+        path = path or Config.MODEL_PATH
+        with h5py.File(path, 'r') as f:
+            config = json.loads(f.attrs['model_config'])
+            weights_group = f['model_weights']
+            layers = []
+            for layer in config['config']['layers']:
+                kind, layer_config = layer['class_name'], layer['config']
+                if kind in PASSTHROUGH_LAYERS:
+                    continue
+                group = weights_group[layer_config['name']]
+                weights = {name.split('/')[-1]: np.asarray(group[name]) for name in group.attrs['weight_names']}
+                if kind == 'Dense':
+                    activation = layer_config.get('activation', 'linear')
+                    if activation not in ACTIVATIONS:
+                        raise ValueError(f"Unsupported activation '{activation}' in layer {layer_config['name']}")
+                    bias = weights.get('bias', np.zeros(weights['kernel'].shape[1], dtype=np.float32))
+                    layers.append(('dense', weights['kernel'], bias, activation))
+                elif kind == 'BatchNormalization':
+                    layers.append(('batchnorm',) + cls._batchnorm_affine(weights, layer_config.get('epsilon', 1e-3)))
+                else:
+                    raise ValueError(f"Unsupported layer type '{kind}' ({layer_config['name']})")
+        return cls(layers)
+
+    @staticmethod
+    def _batchnorm_affine(weights, epsilon):
+        """Inference-mode batch norm as x * scale + offset (same factoring as Keras)"""
+        mean, variance = weights['moving_mean'], weights['moving_variance']
+        scale = 1.0 / np.sqrt(variance + epsilon)
+        if 'gamma' in weights:
+            scale = scale * weights['gamma']
+        offset = -mean * scale
+        if 'beta' in weights:
+            offset = offset + weights['beta']
+        return scale.astype(np.float32), offset.astype(np.float32)
+
+    def fold_batchnorm(self):
+        """
+        Equivalent model without batch norm layers. Each batch norm follows a Dense
+        activation, so it is folded forward: (h * s + o) @ W + b = h @ (s[:, None] * W) + (o @ W + b).
+        """
+        return NumpyModel(self._cast(self._folded_layers()), self.dtype, self.includes_scaling, self.feature_names)
+
+    def _cast(self, layers):
+        return [('dense', kernel.astype(self.dtype), bias.astype(self.dtype), activation)
+                for _, kernel, bias, activation in layers]
+
+    def _folded_layers(self):
+        """Dense-only layers (float64) with batch norms folded in"""
+        layers, pending = [], None
+        for layer in self.layers:
+            if layer[0] == 'batchnorm':
+                if pending is not None:
+                    raise ValueError("Consecutive batch norm layers can't be folded")
+                pending = (np.float64(layer[1]), np.float64(layer[2]))
+                continue
+            _, kernel, bias, activation = layer
+            kernel, bias = np.float64(kernel), np.float64(bias)
+            if pending is not None:
+                scale, offset = pending
+                kernel, bias = scale[:, None] * kernel, offset @ kernel + bias
+                pending = None
+            layers.append(('dense', kernel, bias, activation))
+        if pending is not None:
+            raise ValueError("Trailing batch norm layer can't be folded into a Dense layer")
+        return layers
+
+    def fold_scalers(self, x_mean, x_scale, y_mean, y_scale, feature_names=None):
+        """
+        Equivalent model taking raw features and returning unscaled outputs (StandardScaler on both ends):
+        first layer ((x - mean) / scale) @ W + b, output layer (z @ W + b) * y_scale + y_mean.
+        """
+        if self.includes_scaling:
+            raise ValueError("Scalers are already folded into this model")
+        layers = [list(layer) for layer in self._folded_layers()]
+        first, last = layers[0], layers[-1]
+        if last[3] != 'linear':
+            raise ValueError("Output scaling can only be folded into a linear output layer")
+        x_mean, x_scale = np.float64(x_mean), np.float64(x_scale)
+        first[2] = first[2] - (x_mean / x_scale) @ first[1]
+        first[1] = first[1] / x_scale[:, None]
+        y_mean, y_scale = np.float64(y_mean), np.float64(y_scale)
+        last[1], last[2] = last[1] * y_scale, last[2] * y_scale + y_mean
+        return NumpyModel(self._cast(layers), self.dtype, True,
+                          list(feature_names) if feature_names is not None else None)
+
+    @property
+    def input_dim(self):
+        return self.layers[0][1].shape[0]
+
+    def predict(self, X, verbose=0):
+        """Forward pass for a (batch, features) array; same call shape as keras Model.predict"""
+        x = np.asarray(X, dtype=self.dtype)
+        if x.ndim == 1:
+            x = x[None, :]
+        for layer in self.layers:
+            if layer[0] == 'dense':
+                _, kernel, bias, activation = layer
+                x = ACTIVATIONS[activation](x @ kernel + bias)
+            else:
+                _, scale, offset = layer
+                x = x * scale + offset
+        return x
+
+
+def source_paths():
+    """Files the fused model is derived from"""
+    return [Config.MODEL_PATH, Config.SCALER_X_PATH, Config.SCALER_Y_PATH]
+
+
+def build_fused_model(rows=1000, seed=0):
+    """
+    Fold the scalers and batch norms into the .h5 weights and verify the result against
+    the current scaler_X -> model -> scaler_y pipeline.
+    Returns (fused model, scaler parameters, max abs diff), or None if verification fails.
+    """
+    import joblib
+    import pandas as pd
+    model = NumpyModel.from_h5(Config.MODEL_PATH)
+    scaler_X = joblib.load(Config.SCALER_X_PATH)
+    scaler_y = joblib.load(Config.SCALER_Y_PATH)
+    feature_names = list(scaler_X.feature_names_in_)
+    fused = model.fold_scalers(scaler_X.mean_, scaler_X.scale_, scaler_y.mean_, scaler_y.scale_, feature_names)
+
+    # Inputs spread around the training distribution
+    X = scaler_X.mean_ + scaler_X.scale_ * np.random.default_rng(seed).standard_normal((rows, len(feature_names)))
+    expected = scaler_y.inverse_transform(model.predict(scaler_X.transform(pd.DataFrame(X, columns=feature_names))))
+    actual = fused.predict(X)
+    diff = float(np.max(np.abs(actual - expected)))
+    if not np.allclose(actual, expected, rtol=1e-4, atol=1e-3):
+        print(f"Fused model verification failed: max abs diff {diff:.3e}")
+        return None
+
+    print(f"Fused model verified over {rows} rows (max abs diff {diff:.3e})")
+    scalers = {'x_mean': scaler_X.mean_, 'x_scale': scaler_X.scale_, 'y_mean': scaler_y.mean_, 'y_scale': scaler_y.scale_}
+    return fused, scalers, diff
+
+
+def check_parity(path=None, rows=256, seed=0):
+    """Max absolute difference between NumPy and Keras outputs on random standardized inputs"""
+    import tensorflow as tf
+    path = path or Config.MODEL_PATH
+    numpy_model = NumpyModel.from_h5(path)
+    keras_model = tf.keras.models.load_model(path, compile=False)
+    X = np.random.default_rng(seed).standard_normal((rows, numpy_model.input_dim)).astype(np.float32)
+    expected = keras_model.predict(X, verbose=0)
+    actual = numpy_model.predict(X)
+    diff = float(np.max(np.abs(expected - actual)))
+    scale = float(np.max(np.abs(expected)))
+    print(f"Parity over {rows} rows: max abs diff {diff:.3e} (output scale {scale:.3e})")
+    return np.allclose(actual, expected, rtol=1e-4, atol=1e-4)
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(0 if check_parity() else 1)
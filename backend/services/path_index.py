@@ -0,0 +1,103 @@
+"""
+All-pairs safest-path index over the flight graph.
+
+Built from a risk snapshot (one prediction per country): the cost of flying
+u -> v is v's risk (predicted malaria / 100, the same cost A* uses). A vectorized
+Floyd-Warshall over NumPy arrays yields the distance and next-hop matrices, so a
+path query is answered by walking next hops in O(path length).
+"""
+import copy
+import hashlib
+import time
+import numpy as np
+
+
+def risk_cost(pred):
+    # Normalize risk: divide by 100 to keep costs reasonable
+    return pred['malaria'] / 100.0
+
+
+class PathIndex:
+    def __init__(self, graph, predictions, predicted_at=None):
+        """
+        graph:        compiled FlightGraph (node order and CSR adjacency)
+        predictions:  {country: prediction dict}; countries without one are not traversable
+        predicted_at: when the predictions were computed (e.g. the snapshot time)
+        """
+        self.countries = graph.countries
+        self.node_ids = graph.ids
+        self.graph_version = graph.version
+        indptr, indices = graph.csr()
+        self.predictions = dict(predictions)
+        self.built_at = time.time()
+        self.predicted_at = predicted_at if predicted_at is not None else self.built_at
+        self.dist, self.next_hop = self._floyd_warshall(indptr, indices)
+        self.version = self._content_version(indptr, indices)
+
+    def _floyd_warshall(self, indptr, indices):
+        n = len(self.countries)
+        risks = np.array([
+            risk_cost(self.predictions[c]) if c in self.predictions else np.inf for c in self.countries
+        ], dtype=np.float64)
+
+        # Direct flights: u -> v costs risk[v]; countries without a prediction can't be entered
+        dist = np.full((n, n), np.inf)
+        next_hop = np.full((n, n), -1, dtype=np.int32)
+        rows = np.repeat(np.arange(n), np.diff(indptr))
+        keep = np.isfinite(risks[indices])
+        rows, cols = rows[keep], indices[keep]
+        dist[rows, cols] = risks[cols]
+        next_hop[rows, cols] = cols
+        np.fill_diagonal(dist, 0.0)
+        np.fill_diagonal(next_hop, np.arange(n))
+
+        for k in range(n):
+            via = dist[:, k, None] + dist[None, k, :]
+            better = via < dist
+            if better.any():
+                dist = np.where(better, via, dist)
+                next_hop = np.where(better, next_hop[:, k, None], next_hop)
+        return dist, next_hop
+
+    def _content_version(self, indptr, indices):
+        """Digest of the edges and the predictions paths report: equal versions give equal answers"""
+        digest = hashlib.sha1(indptr.tobytes())
+        digest.update(indices.tobytes())
+        for country in self.countries:
+            pred = self.predictions.get(country)
+            digest.update(repr(pred and (pred['malaria'], pred['dengue'], pred['risk_level'])).encode())
+        return digest.hexdigest()[:16]
+
+    def matches(self, graph, predictions):
+        """True if the index was built from the same graph version and risk costs"""
+        if graph.version != self.graph_version:
+            return False
+        if predictions.keys() != self.predictions.keys():
+            return False
+        return all(risk_cost(predictions[c]) == risk_cost(self.predictions[c]) for c in predictions)
+
+    def with_predictions(self, graph, predictions, predicted_at):
+        """
+        Copy sharing the distance / next-hop matrices (the caller checked matches()), with the
+        new predictions and version, so path details and ETags never go stale
+        """
+        index = copy.copy(self)
+        index.predictions = dict(predictions)
+        index.built_at = time.time()
+        index.predicted_at = predicted_at
+        index.version = index._content_version(*graph.csr())
+        return index
+
+    def age(self):
+        return time.time() - self.built_at
+
+    def path(self, start, end):
+        """(path, total_cost) for the safest route, or (None, None) if unreachable"""
+        u, v = self.node_ids.get(start), self.node_ids.get(end)
+        if u is None or v is None or self.next_hop[u, v] < 0:
+            return None, None
+        path = [start]
+        while u != v:
+            u = int(self.next_hop[u, v])
+            path.append(self.countries[u])
+        return path, float(self.dist[self.node_ids[start], v])
@@ -0,0 +1,209 @@
+"""
+Background global risk snapshot engine.
+
+A scheduler thread periodically predicts every country in REGION_MAP with one
+batched call and publishes the result as an immutable, versioned Snapshot.
+Endpoints read from the current snapshot (stale-while-revalidate): a snapshot
+older than the freshness budget is still served while a refresh runs in the
+background, so request latency no longer includes upstream I/O or inference.
+
+Each snapshot also records, per country, the version in which its prediction
+(cases or risk level) last changed, which backs the change feed (changes())
+and lets endpoints keep their ETags while nothing they depend on changed.
+Versions count up from 1 per engine; clients see them as "<epoch>:<n>", where
+the epoch is random per engine, so a version from another process or an
+earlier run is never mistaken for one of ours.
+"""
+import threading
+import time
+import uuid
+from types import MappingProxyType
+from config import Config
+from utils.constants import REGION_MAP
+
+# Prediction fields that count as a change for the change feed
+CHANGE_FIELDS = ('malaria', 'dengue', 'risk_level')
+
+
+def _signature(prediction):
+    return tuple(prediction.get(f) for f in CHANGE_FIELDS) if prediction is not None else None
+
+
+class Snapshot:
+    """One published set of predictions. Treat as read-only."""
+    def __init__(self, version, predictions, duration, changed_in=None, features=None, epoch=''):
+        self.epoch = epoch
+        self.version = version
+        self.created_at = time.time()
+        self.duration = duration
+        self.predictions = MappingProxyType(dict(predictions))
+        # country -> named model features, so a served prediction can be logged like a live one
+        self.features = MappingProxyType(dict(features or {}))
+        # country -> version in which its prediction last changed (kept for removed countries too)
+        self.changed_in = MappingProxyType(dict(changed_in) if changed_in is not None
+                                           else {c: version for c in predictions})
+        # Last version that changed anything: equal data_version means equal predictions
+        self.data_version = max(self.changed_in.values(), default=version)
+
+    def age(self):
+        return time.time() - self.created_at
+
+    def get(self, country):
+        return self.predictions.get(country)
+
+    def token(self, version):
+        """Client-facing form of one of this engine's versions ("<epoch>:<n>")"""
+        return f'{self.epoch}:{version}'
+
+
+class SnapshotEngine:
+    def __init__(self, ml_service, countries=None, max_age=None, interval=None):
+        self.ml_service = ml_service
+        self.countries = list(countries if countries is not None else REGION_MAP.keys())
+        self.max_age = max_age if max_age is not None else Config.SNAPSHOT_MAX_AGE
+        self.interval = interval if interval is not None else Config.SNAPSHOT_REFRESH_INTERVAL
+        self._snapshot = None
+        # Qualifies every version this engine hands out; a restart starts a new epoch
+        self.epoch = uuid.uuid4().hex[:12]
+        self._version = 0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._listeners = []
+        self._stop = threading.Event()
+        self._thread = None
+        self.failures = 0
+
+    def start(self):
+        """Start the scheduler: refresh now, then every `interval` seconds"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='snapshot-scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh()
+            self._stop.wait(self.interval)
+
+    def add_listener(self, callback):
+        """callback(snapshot) is called after every publish"""
+        self._listeners.append(callback)
+
+    def refresh(self):
+        """Compute and publish a new snapshot; returns it (None if another refresh is running or it failed)"""
+        with self._lock:
+            if self._refreshing:
+                return None
+            self._refreshing = True
+        try:
+            start = time.time()
+            # Scheduler traffic: not written to the prediction log (it would skew log statistics);
+            # the features are kept so each served prediction is logged instead (log_served)
+            features = {}
+            predictions = self.ml_service.predict_countries(self.countries, background=True, log=False,
+                                                            features_out=features)
+            with self._lock:
+                self._version += 1
+                changed_in = self._changed_in(self._snapshot, predictions, self._version)
+                snapshot = Snapshot(self._version, predictions, time.time() - start, changed_in, features,
+                                    self.epoch)
+                self._snapshot = snapshot
+            print(f"Snapshot v{snapshot.version} published: {len(predictions)} countries in {snapshot.duration:.2f}s")
+        except Exception as e:
+            self.failures += 1
+            print(f"Snapshot refresh failed: {e}")
+            return None
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+        for callback in self._listeners:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                print(f"Snapshot listener error: {e}")
+        return snapshot
+
+    @staticmethod
+    def _changed_in(previous, predictions, version):
+        if previous is None:
+            return None
+        changed_in = dict(previous.changed_in)
+        for country in set(predictions) | set(previous.predictions):
+            if _signature(predictions.get(country)) != _signature(previous.get(country)):
+                changed_in[country] = version
+        return changed_in
+
+    def log_served(self, snapshot, country):
+        """Write one prediction-log row for a prediction served from the snapshot"""
+        features = snapshot.features.get(country)
+        if features is None:
+            return
+        try:
+            self.ml_service.logger.log_prediction(country, features, snapshot.predictions[country])
+        except Exception as e:
+            print(f"Warning: Failed to log prediction: {e}")
+
+    def refresh_async(self):
+        threading.Thread(target=self.refresh, name='snapshot-refresh', daemon=True).start()
+
+    def get(self):
+        """
+        Current snapshot without blocking (None until the first one is published).
+        A missing or stale snapshot triggers a background refresh.
+        """
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.age() > self.max_age:
+            if not self._refreshing:
+                self.refresh_async()
+        return snapshot
+
+    def changes(self, since=None):
+        """
+        Countries whose prediction or risk level changed after version `since` (an
+        "<epoch>:<n>" string from a previous response), as of the current snapshot (None
+        until one is published). A since that this engine can't answer (missing, malformed,
+        from another epoch or ahead of the current version) gets every country with
+        reset=True. A removed country has prediction None.
+        """
+        snapshot = self.get()
+        if snapshot is None:
+            return None
+        version = self._parse_version(since)
+        reset = version is None or version > snapshot.version
+        if reset:
+            countries = sorted(snapshot.predictions)
+        else:
+            countries = sorted(c for c, v in snapshot.changed_in.items() if v > version)
+        return {
+            'version': snapshot.token(snapshot.version),
+            'since': since,
+            'reset': reset,
+            'changes': [
+                {'country': c, 'prediction': snapshot.get(c), 'changed_in': snapshot.token(snapshot.changed_in[c])}
+                for c in countries
+            ]
+        }
+
+    def _parse_version(self, token):
+        """n for an "<epoch>:<n>" token of this engine's epoch, else None"""
+        epoch, _, number = (token or '').partition(':')
+        if epoch != self.epoch or not number.isdigit():
+            return None
+        return int(number)
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            'version': snapshot.token(snapshot.version) if snapshot else None,
+            'data_version': snapshot.token(snapshot.data_version) if snapshot else None,
+            'age_seconds': round(snapshot.age(), 1) if snapshot else None,
+            'countries': len(snapshot.predictions) if snapshot else 0,
+            'last_refresh_seconds': round(snapshot.duration, 2) if snapshot else None,
+            'max_age_seconds': self.max_age,
+            'refresh_interval_seconds': self.interval,
+            'refreshing': self._refreshing,
+            'failures': self.failures
+        }
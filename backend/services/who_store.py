@@ -0,0 +1,140 @@
+"""
+Local store of WHO GHO malaria case counts (indicator MALARIA_CONF_CASES).
+
+Instead of one filtered WHO query per country per prediction, the indicator is
+pulled for every country in COUNTRY_CODE_MAP with a single bulk request (or read
+from a saved dump), indexed by country and year, and the lag / rolling features
+are precomputed, so serving needs no WHO network traffic.
+
+A missing or stale dump (older than WHO_STORE_MAX_AGE) is refreshed in the
+background on first use; failed refreshes are retried after
+WHO_STORE_RETRY_INTERVAL. Refresh the dump by hand with:  python -m services.who_store
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from config import Config
+from utils.constants import COUNTRY_CODE_MAP
+
+WHO_INDICATOR_URL = "https://ghoapi.azureedge.net/api/MALARIA_CONF_CASES?$format=json"
+
+
+class WHOStore:
+    def __init__(self, dump_path=None):
+        self.dump_path = dump_path or Config.WHO_DUMP_PATH
+        self.cases = {}        # country -> {year: yearly confirmed cases}
+        self.lag_data = {}     # country -> precomputed lag / rolling features
+        self.baseline = {}     # country -> most recent monthly case estimate
+        self.fetched_at = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._last_attempt = None
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.load()
+                    self._loaded = True
+        self._refresh_if_stale()
+
+    def _refresh_if_stale(self):
+        """Start a background refresh when the store is empty or old (not more often than the retry interval)"""
+        if self.fetched_at is not None and time.time() - self.fetched_at < Config.WHO_STORE_MAX_AGE:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if self._refreshing or (self._last_attempt is not None
+                                    and now - self._last_attempt < Config.WHO_STORE_RETRY_INTERVAL):
+                return
+            self._refreshing = True
+            self._last_attempt = now
+        threading.Thread(target=self._refresh_background, name='who-store-refresh', daemon=True).start()
+
+    def _refresh_background(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"WHO store refresh failed (retrying in {Config.WHO_STORE_RETRY_INTERVAL}s): {e}")
+        finally:
+            self._refreshing = False
+
+    def load(self):
+        """Load the saved dump (if any) and rebuild the index"""
+        if not os.path.exists(self.dump_path):
+            return False
+        try:
+            with open(self.dump_path) as f:
+                dump = json.load(f)
+            self._index(dump['cases'], dump.get('fetched_at'))
+            print(f"WHO store loaded: {len(self.cases)} countries from {self.dump_path}")
+            return True
+        except Exception as e:
+            print(f"WHO store load error: {e}")
+            return False
+
+    def refresh(self):
+        """Pull the indicator for all countries in one request, then index and save it"""
+        from services.http_client import HTTPClient
+        response = HTTPClient.get(WHO_INDICATOR_URL, timeout=30)
+        response.raise_for_status()
+        code_to_country = {code: country for country, code in COUNTRY_CODE_MAP.items()}
+
+        cases = {}
+        for rec in response.json().get('value', []):
+            country = code_to_country.get(rec.get('SpatialDim'))
+            if country and rec.get('TimeDim') is not None:
+                cases.setdefault(country, {})[str(rec['TimeDim'])] = rec.get('NumericValue')
+
+        fetched_at = time.time()
+        with self._lock:
+            self._index(cases, fetched_at)
+            self._loaded = True
+        self._save({'indicator': 'MALARIA_CONF_CASES', 'fetched_at': fetched_at, 'cases': cases})
+        print(f"WHO store refreshed: {len(cases)} countries saved to {self.dump_path}")
+        return len(cases)
+
+    def _save(self, dump):
+        """Write the dump to a temp file and rename it, so readers never see a partial file"""
+        directory = os.path.dirname(self.dump_path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.who_dump-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(dump, f)
+            os.replace(tmp_path, self.dump_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _index(self, cases, fetched_at):
+        """Build a new index and swap it in at once; readers keep using the old one until then"""
+        from services.api_service import APIService
+        new_cases = {country: {int(year): value for year, value in years.items()} for country, years in cases.items()}
+        lag_data, baseline = {}, {}
+        for country, years in new_cases.items():
+            if not years:
+                continue
+            records = [{'TimeDim': year, 'NumericValue': value} for year, value in years.items()]
+            lag_data[country] = APIService.lag_data_from_who_records(records)
+            latest = years[max(years)]
+            if latest is not None:
+                baseline[country] = latest / 12.0
+        self.cases, self.lag_data, self.baseline, self.fetched_at = new_cases, lag_data, baseline, fetched_at
+
+    def get_lag_data(self, country):
+        """Precomputed lag / rolling features, or None if the country is not in the store"""
+        self._ensure_loaded()
+        lag_data = self.lag_data.get(country)
+        return dict(lag_data) if lag_data else None
+
+    def get_baseline(self, country):
+        self._ensure_loaded()
+        return self.baseline.get(country)
+
+
+if __name__ == '__main__':
+    WHOStore().refresh()